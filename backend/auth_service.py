@@ -1,4 +1,5 @@
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -8,40 +9,179 @@ from webdriver_manager.chrome import ChromeDriverManager
 import time
 import logging
 import os
+import shutil
+
+from scrapers.http_cache import CACHE_DIR
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Resolved chromedriver binary, so restarts skip webdriver-manager's version lookup
+CHROMEDRIVER_PATH_FILE = os.path.join(CACHE_DIR, 'chromedriver_path')
+
+# How chromedriver words "this driver is for a different Chrome"
+VERSION_MISMATCH_HINTS = ("only supports Chrome version", "Current browser version is")
+
 class AuthService:
     def __init__(self):
         self.driver = None
+        # PageArchive to record every page the scrapers read (see scrapers/page_archive.py)
+        self.archive = None
+        # 'browser' renders every page in Chrome; 'hybrid' reads pages over HTTP with the browser's cookies;
+        # 'batch' pulls article pages with fetch() calls inside the logged-in page
+        self.fetch_mode = 'browser'
+        # Scrape with --headless=new on the same profile; the login window is always visible
+        self.headless = False
+        self.driver_headless = False
+        # Key of scrapers.browser.BROWSER_PROFILES used for scraping drivers ('lean' blocks heavy resources)
+        self.browser_profile = 'full'
         self.project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.user_data_dir = os.path.join(self.project_dir, 'chrome_profile')
+        # 'persistent' scrapes on chrome_profile; 'slim' on a throwaway copy of profile_template
+        self.profile_mode = 'persistent'
+        self.driver_profile_dir = None
+        self._driver_path = None
 
     def get_driver(self, interactive=False):
         # Check if existing driver is still alive
+        if self.driver and interactive and (self.driver_headless or self.driver_profile_dir != self.user_data_dir):
+            # Logging in needs a visible window on the persistent profile: restart the browser
+            self.close()
         if self.driver:
             try:
                 _ = self.driver.current_url
-                return self.driver
+                return self._wrap(self.driver)
             except:
-                try: self.driver.quit()
-                except: pass
-                self.driver = None
+                self.close()
         
+        self._start(interactive=interactive)
+        return self._wrap(self.driver)
+
+    def lease_driver(self):
+        """Return the shared driver, starting it if needed, without the liveness probe.
+
+        Callers hold a lease from driver_lease.driver_leases, which checks
+        liveness only after a scrape raises or a navigation fails (see discard_if_dead).
+        """
+        if self.driver is None:
+            self._start()
+        return self._wrap(self.driver)
+
+    def scrape_profile_dir(self, prefix='scraper_profile_'):
+        """Profile directory for a scraping browser: chrome_profile itself, or a slim throwaway copy."""
+        if self.profile_mode != 'slim':
+            return self.user_data_dir
+        from profile_template import scratch_profile
+        return scratch_profile(self.user_data_dir, prefix)
+
+    def _start(self, interactive=False):
+        profile_dir = self.user_data_dir if interactive else self.scrape_profile_dir()
+        try:
+            self.driver = self.new_driver(profile_dir, interactive=interactive)
+        except:
+            if profile_dir != self.user_data_dir:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        self.driver_profile_dir = profile_dir
+        self.driver_headless = self.headless and not interactive
+
+    def discard_if_dead(self):
+        """Drop the shared driver if its browser session is gone so the next lease starts a new one."""
+        if not self.driver:
+            return
+        try:
+            _ = self.driver.current_url
+        except:
+            logger.warning("Browser session lost; it will be restarted on next use")
+            self.close()
+
+    def new_driver(self, user_data_dir, interactive=False):
+        """Start a Chrome instance on the given profile directory."""
+        from scrapers.browser import BROWSER_PROFILES, apply_profile
+        # The login window always loads everything so sign-in pages work as usual
+        profile = BROWSER_PROFILES['full' if interactive else self.browser_profile]
         options = Options()
-        options.add_argument(f"--user-data-dir={self.user_data_dir}")
+        options.page_load_strategy = profile['page_load_strategy']
+        options.add_argument(f"--user-data-dir={user_data_dir}")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         
         if interactive:
             options.add_experimental_option("detach", True)
-        else:
-            # options.add_argument("--headless") # Headless would lose the session if not careful
-            pass
+        elif self.headless:
+            # The new headless mode runs the full browser, so the profile's cookies and storage are used as is
+            options.add_argument("--headless=new")
+            options.add_argument("--window-size=1920,1080")
             
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        return self.driver
+        try:
+            driver = webdriver.Chrome(service=Service(self.driver_path()), options=options)
+        except SessionNotCreatedException as e:
+            # A locked profile or a crashed browser will not be fixed by another chromedriver
+            if not any(hint in (e.msg or '') for hint in VERSION_MISMATCH_HINTS):
+                raise
+            # Chrome updated itself since the driver was resolved: look it up again
+            logger.info("Cached chromedriver does not match Chrome, resolving a new one")
+            driver = webdriver.Chrome(service=Service(self.driver_path(refresh=True)), options=options)
+        apply_profile(driver, profile)
+        if self.headless and not interactive:
+            self._hide_headless(driver)
+        return driver
+
+    def driver_path(self, refresh=False):
+        """Path of the chromedriver binary, resolved once and remembered across restarts."""
+        if self._driver_path and not refresh:
+            return self._driver_path
+        if not refresh:
+            try:
+                with open(CHROMEDRIVER_PATH_FILE) as f:
+                    path = f.read().strip()
+                if os.access(path, os.X_OK):
+                    self._driver_path = path
+                    return path
+            except OSError:
+                pass
+        path = ChromeDriverManager().install()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(CHROMEDRIVER_PATH_FILE, 'w') as f:
+            f.write(path)
+        self._driver_path = path
+        return path
+
+    def warm_up(self):
+        """Start the shared browser ahead of the first scrape and make sure it answers."""
+        if self.headless:
+            # Also proves the saved login still works, which headless scrapes cannot fix themselves
+            return self.check_session()[0]
+        try:
+            self.lease_driver()
+            _ = self.driver.current_url
+            logger.info("Browser pre-launched")
+            return True
+        except Exception as e:
+            logger.error(f"Browser pre-launch failed: {e}")
+            self.close()
+            return False
+
+    def _hide_headless(self, driver):
+        # Headless Chrome announces itself as "HeadlessChrome", which some help centres treat as a bot
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent")
+            driver.execute_cdp_cmd("Network.setUserAgentOverride",
+                                   {"userAgent": user_agent.replace("HeadlessChrome", "Chrome")})
+        except Exception as e:
+            logger.warning(f"Could not override the headless user agent: {e}")
+
+    def _wrap(self, driver):
+        if self.archive is not None:
+            from scrapers.page_archive import RecordingDriver
+            driver = RecordingDriver(driver, self.archive)
+        if self.fetch_mode == 'hybrid':
+            from scrapers.hybrid_driver import HybridDriver
+            driver = HybridDriver(driver)
+        elif self.fetch_mode == 'batch':
+            from scrapers.hybrid_driver import BatchFetchDriver
+            driver = BatchFetchDriver(driver)
+        return driver
 
     def launch_login(self, target_url="https://support.toddleapp.com/"):
         """Launch a persistent browser window for the user to log in."""
@@ -66,10 +206,29 @@ class AuthService:
             self.driver = None
             return False, str(e)
 
+    def check_session(self, target_url="https://support.toddleapp.com/"):
+        """Open target_url with the persisted profile and report whether the login still holds."""
+        try:
+            self.get_driver()
+            # The raw driver: a hybrid wrapper would answer over HTTP without touching the browser
+            self.driver.get(target_url)
+        except Exception as e:
+            logger.error(f"Session check failed: {e}")
+            return False, str(e)
+        success, message = self.check_authentication()
+        if success:
+            logger.info(f"Saved session is valid ({'headless' if self.driver_headless else 'visible'} browser)")
+        else:
+            logger.warning(f"Saved session is not valid, use /launch-login to sign in again: {message}")
+        return success, message
+
     def close(self):
         if self.driver:
             try: self.driver.quit()
             except: pass
             self.driver = None
+        if self.driver_profile_dir and self.driver_profile_dir != self.user_data_dir:
+            shutil.rmtree(self.driver_profile_dir, ignore_errors=True)
+        self.driver_profile_dir = None
 
 auth_service = AuthService()
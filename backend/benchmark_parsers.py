@@ -0,0 +1,60 @@
+"""Compare the HTML parser backends on saved pages.
+
+Usage: python benchmark_parsers.py [page.html ...]
+Defaults to the checked-in toddle_debug.html and toddle_collection_debug.html.
+"""
+import os
+import sys
+import time
+
+from scrapers import html_parser
+from scrapers.toddle_scraper import ToddleScraper, clean_text
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PAGES = [
+    os.path.join(PROJECT_DIR, 'toddle_debug.html'),
+    os.path.join(PROJECT_DIR, 'toddle_collection_debug.html'),
+]
+CONTENT_SELECTORS = ['.intercom-article-body', 'article', '.article-body', '[role="main"]', '.article-content']
+
+def timed(fn, repeat):
+    """Best-of-repeat wall time of fn() in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def extraction(markup, parser):
+    """What the Toddle scraper reads off a page, to check the backends agree."""
+    soup = html_parser.parse(markup, parser)
+    scraper = ToddleScraper(None)
+    name = scraper._extract_collection_name(soup)
+    links = [a['href'] for a in soup.find_all('a', href=True)]
+    return name, links, clean_text(soup.get_text(' '))
+
+def benchmark(path, repeat=20):
+    with open(path, encoding='utf-8') as f:
+        markup = f.read()
+    print(f"\n{os.path.basename(path)} ({len(markup) / 1024:.0f} KB)")
+
+    parsers = [p for p in html_parser.BACKENDS if p != 'lxml' or html_parser.HAVE_LXML]
+    baseline = extraction(markup, 'html.parser')
+    for parser in parsers:
+        parse_ms = timed(lambda: html_parser.parse(markup, parser), repeat)
+        select_ms = timed(lambda: html_parser.parse(markup, parser).select_one(', '.join(CONTENT_SELECTORS)), repeat)
+        same = 'same output' if extraction(markup, parser) == baseline else 'OUTPUT DIFFERS'
+        print(f"  bs4 + {parser:<12} parse {parse_ms:7.2f} ms   parse+select {select_ms:7.2f} ms   {same}")
+
+    if html_parser.LexborHTMLParser is not None:
+        parse_ms = timed(lambda: html_parser.LexborHTMLParser(markup), repeat)
+        select_ms = timed(lambda: html_parser.select_html(markup, CONTENT_SELECTORS), repeat)
+        print(f"  selectolax/lexbor  parse {parse_ms:7.2f} ms   parse+select {select_ms:7.2f} ms")
+    else:
+        print("  selectolax not installed (pip install selectolax)")
+
+if __name__ == "__main__":
+    print(f"Configured backend: {html_parser.backend}")
+    for page in sys.argv[1:] or DEFAULT_PAGES:
+        benchmark(page)
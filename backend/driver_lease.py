@@ -0,0 +1,102 @@
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+from auth_service import auth_service
+from scrapers.browser import session_failed
+
+logger = logging.getLogger(__name__)
+
+class LeaseTimeout(Exception):
+    """The shared browser did not become free in time."""
+
+class _Ticket:
+    def __init__(self, label):
+        self.label = label
+        self.queued_at = time.time()
+        self.started_at = None
+
+class DriverLeaseManager:
+    """Exclusive, first-come-first-served checkout of the shared browser.
+
+    FastAPI runs the sync endpoints on a thread pool, so two scrapes can arrive
+    at the same time. Each takes a lease and waits in arrival order instead of
+    navigating the same browser concurrently.
+    """
+
+    def __init__(self, timeout=600):
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._holder = None
+
+    @contextmanager
+    def lease(self, label, timeout=None):
+        """Hold the browser for the block and yield its driver.
+
+        Raises LeaseTimeout if it is still busy after timeout seconds. If the
+        block raised or a navigation failed, the browser is probed on return
+        and discarded if its session is gone.
+        """
+        ticket = self._acquire(label, self.timeout if timeout is None else timeout)
+        try:
+            driver = auth_service.lease_driver()
+            try:
+                yield driver
+            except Exception:
+                # Only a failed scrape pays for a liveness check, not every checkout
+                auth_service.discard_if_dead()
+                raise
+            # The scrapers catch per-page errors themselves, so a browser that died
+            # mid-scrape usually shows up only as a failed navigation
+            if session_failed(driver):
+                auth_service.discard_if_dead()
+        finally:
+            self._release(ticket)
+
+    def _acquire(self, label, timeout):
+        ticket = _Ticket(label)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting.append(ticket)
+            if self._holder is not None:
+                logger.info(f"{label} waiting for the browser (position {len(self._waiting)}, held by {self._holder.label})")
+            try:
+                while self._holder is not None or self._waiting[0] is not ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        ahead = self._waiting.index(ticket) + (self._holder is not None)
+                        raise LeaseTimeout(f"Browser still busy after {timeout}s ({ahead} requests ahead of {label})")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+                raise
+            self._waiting.popleft()
+            ticket.started_at = time.time()
+            self._holder = ticket
+            return ticket
+
+    def _release(self, ticket):
+        with self._cond:
+            if self._holder is ticket:
+                self._holder = None
+            self._cond.notify_all()
+
+    def status(self):
+        """Who holds the browser and who is queued, in the order they will get it."""
+        now = time.time()
+        with self._cond:
+            holder = self._holder
+            return {
+                "holder": holder.label if holder else None,
+                "held_for": round(now - holder.started_at, 1) if holder else None,
+                "queue": [
+                    {"position": i, "label": t.label, "waiting_for": round(now - t.queued_at, 1)}
+                    for i, t in enumerate(self._waiting, 1)
+                ],
+            }
+
+driver_leases = DriverLeaseManager()
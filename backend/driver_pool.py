@@ -0,0 +1,152 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from auth_service import auth_service
+from scrapers.browser import session_failed
+
+logger = logging.getLogger(__name__)
+
+# Caches, crash dumps and lock files are not needed for the session and only slow the copy down
+PROFILE_COPY_IGNORE = shutil.ignore_patterns(
+    'Singleton*', 'lockfile', 'LOCK', 'DevToolsActivePort',
+    'Cache', 'Code Cache', 'GPUCache', 'ShaderCache', 'GrShaderCache', 'GraphiteDawnCache',
+    'DawnGraphiteCache', 'DawnWebGPUCache', 'Service Worker', 'Crashpad',
+    'component_crx_cache', 'extensions_crx_cache', 'optimization_guide_model_store',
+    'OnDeviceHeadSuggestModel', 'segmentation_platform',
+)
+
+def copy_profile(source_dir, target_dir):
+    """Snapshot a Chrome profile directory, skipping caches and files that are locked."""
+    try:
+        shutil.copytree(source_dir, target_dir, ignore=PROFILE_COPY_IGNORE, dirs_exist_ok=True)
+    except shutil.Error as e:
+        # Files held open by a running Chrome cannot always be copied; the session survives without them
+        logger.warning(f"Skipped {len(e.args[0])} profile files while copying {source_dir}")
+
+class DriverPool:
+    """N Chrome instances, each started from its own copy of the authenticated profile.
+
+    Chrome refuses to open one user-data-dir twice, so every instance gets a
+    snapshot of chrome_profile taken when the pool starts (or, in slim profile
+    mode, a copy of the much smaller profile_template). After a new login,
+    refresh() has the next map() restart the pool from a fresh snapshot.
+    """
+
+    def __init__(self, size=4, source_profile=None):
+        self.size = size
+        self.source_profile = source_profile or auth_service.user_data_dir
+        self._drivers = []
+        self._profile_dirs = {}     # driver -> its profile directory
+        self._idle = queue.Queue()
+        self._stale = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._drivers:
+                return
+            for i in range(self.size):
+                driver = self._new_driver(i)
+                self._drivers.append(driver)
+                self._idle.put(driver)
+            self._stale = False
+            logger.info(f"Driver pool started with {self.size} Chrome instances")
+
+    def _new_driver(self, i):
+        if auth_service.profile_mode == 'slim':
+            profile_dir = auth_service.scrape_profile_dir(prefix=f"scraper_profile_{i}_")
+        else:
+            profile_dir = tempfile.mkdtemp(prefix=f"scraper_profile_{i}_")
+            copy_profile(self.source_profile, profile_dir)
+        try:
+            driver = auth_service.new_driver(profile_dir)
+        except:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        self._profile_dirs[driver] = profile_dir
+        return driver
+
+    def refresh(self):
+        """The login changed: re-snapshot the profile before the next map()."""
+        self._stale = True
+
+    @contextmanager
+    def driver(self):
+        """Borrow an idle driver for the duration of the block.
+
+        If the block raised or a navigation failed, the driver is probed and
+        replaced by a new instance when its browser is gone.
+        """
+        self.start()
+        driver = self._idle.get()
+        try:
+            yield auth_service._wrap(driver)
+        except Exception:
+            driver = self._replace_if_dead(driver)
+            raise
+        else:
+            if session_failed(driver):
+                driver = self._replace_if_dead(driver)
+        finally:
+            with self._lock:
+                # A driver the pool was closed under must not end up in the restarted pool
+                if driver in self._drivers:
+                    self._idle.put(driver)
+
+    def _replace_if_dead(self, driver):
+        try:
+            _ = driver.current_url
+            return driver
+        except:
+            pass
+        with self._lock:
+            if driver not in self._drivers:
+                # close() already shut the pool (or this driver) down
+                return driver
+            logger.warning("Pool browser session lost, starting a new one")
+            i = self._drivers.index(driver)
+            try: driver.quit()
+            except: pass
+            profile_dir = self._profile_dirs.pop(driver, None)
+            if profile_dir:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            try:
+                replacement = self._new_driver(i)
+            except Exception as e:
+                # Leave the dead driver in place; the next borrower fails and tries again
+                logger.error(f"Could not restart pool browser: {e}")
+                return driver
+            self._drivers[i] = replacement
+            return replacement
+
+    def map(self, fn, items):
+        """Call fn(driver, item) for every item across the pool.
+
+        Results are yielded in input order, each as soon as it and the ones before it are done.
+        """
+        def run(item):
+            with self.driver() as driver:
+                return fn(driver, item)
+
+        if self._stale:
+            self.close()
+        self.start()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            yield from executor.map(run, items)
+
+    def close(self):
+        with self._lock:
+            for driver in self._drivers:
+                try: driver.quit()
+                except: pass
+            for profile_dir in self._profile_dirs.values():
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            self._drivers = []
+            self._profile_dirs = {}
+            self._idle = queue.Queue()
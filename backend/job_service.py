@@ -0,0 +1,243 @@
+"""Background scrape jobs.
+
+A long crawl can outlive the HTTP request (and the proxy in front of it) that
+started it. POST /jobs instead queues the scrape with the JobScheduler and
+returns the job's id at once. A few worker threads run queued jobs in
+arrival order, except that a job waits while another job for the same crawl
+is running: the two would share, and reset, one frontier. (A job also waits
+for a direct request scraping the same crawl; see frontier.open_frontier.)
+Jobs that need the shared browser have a worker of their own: they can wait
+hours for the browser lease, and must not hold up the HTTP-only scrapes. Each job streams
+its export into a file under JOBS_DIR as articles finish, and reports
+progress from its crawl frontier.
+"""
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+
+from scrapers.http_cache import CACHE_DIR
+from scrapers.frontier import DONE as URL_DONE, FAILED as URL_FAILED
+from scrapers.markdown_writer import MarkdownWriter
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(CACHE_DIR, 'jobs')
+
+BROWSER = 'browser'
+HTTP = 'http'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class JobWriter(MarkdownWriter):
+    """MarkdownWriter that counts an article as converted once it is scraped,
+    even when its Markdown is held back until the end (Toddle)."""
+
+    def __init__(self, sink):
+        super().__init__(sink)
+        self._scraped = 0
+
+    def scraped(self, article):
+        self._scraped += 1
+
+    @property
+    def converted(self):
+        return max(self.articles, self._scraped)
+
+class Job:
+    def __init__(self, kind, url, request, lane=HTTP):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.url = url
+        self.request = request
+        self.lane = lane
+        self.state = QUEUED
+        self.message = None
+        self.changes = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result_path = os.path.join(JOBS_DIR, f"{self.id}.md")
+        self.writer = None
+        self._frontier = None
+        self._counts = {}
+        self._baseline = 0
+
+    def track(self, frontier):
+        """Report progress from this frontier (called by the runner once it has opened it)."""
+        counts = frontier.counts()
+        # URLs a resumed run had already finished do not count towards the rate
+        self._baseline = counts.get(URL_DONE, 0) + counts.get(URL_FAILED, 0)
+        self._counts = counts
+        self._frontier = frontier
+
+    def finish(self, state, message):
+        if self._frontier is not None:
+            self._counts = self._frontier.counts()
+            self._frontier = None
+        self.state = state
+        self.message = message
+        self.finished_at = time.time()
+
+    def progress(self):
+        """Counters for the job's URLs, and the estimated seconds left.
+
+        discovered: URLs the crawl knows about so far
+        fetched: URLs fetched and turned into an article
+        converted: articles written to the result
+        failed: URLs that could not be scraped
+        """
+        frontier = self._frontier
+        counts = frontier.counts() if frontier is not None else self._counts
+        done = counts.get(URL_DONE, 0)
+        failed = counts.get(URL_FAILED, 0)
+        discovered = sum(counts.values())
+        eta = None
+        processed = done + failed - self._baseline
+        if self.state == RUNNING and processed > 0:
+            elapsed = time.time() - self.started_at
+            eta = round((discovered - done - failed) * elapsed / processed, 1)
+        return {
+            "discovered": discovered,
+            "fetched": done,
+            "converted": self.writer.converted if self.writer else 0,
+            "failed": failed,
+            "eta_seconds": eta,
+        }
+
+    def status(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "url": self.url,
+            "state": self.state,
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress(),
+            "changes": self.changes,
+        }
+
+class JobScheduler:
+    """Runs queued scrape jobs on `workers` threads, first come first served.
+
+    Runners are registered per kind and called as runner(request, writer, job).
+    They write the export to writer and return (markdown, message, changes);
+    markdown is whatever the scraper returned instead of writing (normally '').
+    Kinds registered with browser=True run one at a time on their own worker,
+    since they all queue for the one shared browser anyway.
+    Only the newest `keep` finished jobs and their results are kept.
+    """
+
+    def __init__(self, workers=2, keep=100):
+        self.workers = workers
+        self.keep = keep
+        self._runners = {}
+        self._lanes = {}
+        self._jobs = {}
+        self._pending = deque()
+        self._running = set()       # (kind, url) of the jobs being run
+        self._threads = {HTTP: [], BROWSER: []}
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def register(self, kind, runner, browser=False):
+        self._runners[kind] = runner
+        self._lanes[kind] = BROWSER if browser else HTTP
+
+    def kinds(self):
+        return list(self._runners)
+
+    def submit(self, kind, url, request):
+        if kind not in self._runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(kind, url, request, self._lanes[kind])
+        with self._cond:
+            self._jobs[job.id] = job
+            self._prune()
+            self._pending.append(job)
+            threads = self._threads[job.lane]
+            while len(threads) < (1 if job.lane == BROWSER else self.workers):
+                thread = threading.Thread(target=self._work, args=(job.lane,),
+                                          name=f"scrape-job-{job.lane}-{len(threads) + 1}", daemon=True)
+                thread.start()
+                threads.append(thread)
+            self._cond.notify_all()
+        logger.info(f"Queued {kind} job {job.id} for {url}")
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Every known job, newest first."""
+        with self._cond:
+            return list(reversed(self._jobs.values()))
+
+    def _next(self, lane):
+        """Wait for the lane's oldest pending job whose crawl is not already running; None once closed."""
+        with self._cond:
+            while not self._closed:
+                for job in self._pending:
+                    if job.lane == lane and (job.kind, job.url) not in self._running:
+                        self._pending.remove(job)
+                        self._running.add((job.kind, job.url))
+                        return job
+                self._cond.wait()
+            return None
+
+    def _work(self, lane):
+        while True:
+            job = self._next(lane)
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._running.discard((job.kind, job.url))
+                    self._cond.notify_all()
+
+    def _run(self, job):
+        job.state = RUNNING
+        job.started_at = time.time()
+        logger.info(f"Running {job.kind} job {job.id}")
+        try:
+            os.makedirs(JOBS_DIR, exist_ok=True)
+            with open(job.result_path, 'w', encoding='utf-8') as f:
+                job.writer = JobWriter(f)
+                markdown, message, job.changes = self._runners[job.kind](job.request, job.writer, job)
+                if markdown:
+                    job.writer.write(markdown)
+        except Exception as e:
+            logger.exception(f"{job.kind} job {job.id} failed")
+            job.finish(FAILED, str(e))
+        else:
+            job.finish(DONE, message)
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.state in (DONE, FAILED)]
+        for job in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job.id]
+            try:
+                os.remove(job.result_path)
+            except OSError:
+                pass
+
+    def close(self):
+        """Stop the workers once their current job ends; queued jobs are dropped."""
+        with self._cond:
+            self._closed = True
+            for job in self._pending:
+                job.finish(FAILED, "Server shut down before the job started")
+            self._pending.clear()
+            self._cond.notify_all()
+
+job_scheduler = JobScheduler()
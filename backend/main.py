@@ -1,8 +1,13 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uvicorn
+import os
+import threading
 from models import LoginRequest, LoginResponse, ScrapeRequest, ScrapeResponse
 from auth_service import auth_service
 from scraper_service import scraper_service
@@ -10,8 +15,83 @@ from scrapers.odoo_scraper import scrape_odoo
 from scrapers.prompting_guide_scraper import scrape_prompting_guide
 from scrapers.isams_developer_scraper import scrape_isams_developer
 from scrapers.toddle_scraper import scrape_toddle
+from scrapers.http_client import http_client
+from scrapers.politeness import politeness
+from scrapers.page_archive import PageArchive
+from scrapers.manifest import manifest
+from scrapers.frontier import open_frontier, FrontierBusy
+from scrapers import pipeline
+from driver_pool import DriverPool
+from driver_lease import driver_leases, LeaseTimeout
+from job_service import job_scheduler, DONE as JOB_DONE, FAILED as JOB_FAILED
+from stream_service import ArticleStream, MEDIA_TYPES
 
-app = FastAPI(title="iSAMS Documentation Scraper")
+def warm_up():
+    # Before any scrape thread exists, so converter processes are never forked from a busy server
+    pipeline.start()
+    if os.environ.get("SCRAPER_PREWARM", "1") == "0":
+        return
+    if auth_service.warm_up() and driver_pool is not None:
+        driver_pool.start()
+
+def shut_down():
+    if driver_pool is not None:
+        driver_pool.close()
+    auth_service.close()
+    job_scheduler.close()
+    http_client.close()
+    pipeline.shutdown()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Pay for chromedriver resolution and Chrome start-up here rather than on the first request
+    await run_in_threadpool(warm_up)
+    yield
+    await run_in_threadpool(shut_down)
+
+app = FastAPI(title="iSAMS Documentation Scraper", lifespan=lifespan)
+
+# Record every fetched page for offline replay (python -m scrapers.page_archive ...)
+if os.environ.get("SCRAPER_RECORD_ARCHIVE"):
+    page_archive = PageArchive(os.environ["SCRAPER_RECORD_ARCHIVE"])
+    auth_service.archive = page_archive
+    http_client.start_recording(page_archive)
+
+# "hybrid": log in with Chrome once, then fetch Toddle / Zendesk pages over plain HTTP;
+# "batch": keep one logged-in page and fetch articles from inside it in batches
+auth_service.fetch_mode = os.environ.get("SCRAPER_FETCH_MODE", "browser")
+
+# Scrape with headless Chrome on the login profile (the login window stays visible)
+auth_service.headless = os.environ.get("SCRAPER_HEADLESS", "").lower() in ("1", "true", "yes")
+
+# "lean": eager page loads and no images, fonts, media, analytics or chat widgets
+auth_service.browser_profile = os.environ.get("SCRAPER_BROWSER_PROFILE", "full")
+
+# "slim": scraping browsers start from a small copy of the login state (see profile_template.py)
+auth_service.profile_mode = os.environ.get("SCRAPER_PROFILE_MODE", "persistent")
+
+# How long a browser scrape waits in line for the shared browser before giving up
+driver_leases.timeout = float(os.environ.get("SCRAPER_LEASE_TIMEOUT", "600"))
+
+# Starting request rate and burst per host; the limiter raises the rate while the host stays healthy
+if os.environ.get("SCRAPER_HOST_RATE"):
+    politeness.limiter_defaults["rate"] = float(os.environ["SCRAPER_HOST_RATE"])
+if os.environ.get("SCRAPER_HOST_BURST"):
+    politeness.limiter_defaults["burst"] = int(os.environ["SCRAPER_HOST_BURST"])
+
+# Spread Toddle / iSAMS Developer article pages across several Chrome instances
+DRIVER_POOL_SIZE = int(os.environ.get("SCRAPER_DRIVER_POOL_SIZE", "0"))
+driver_pool = DriverPool(DRIVER_POOL_SIZE) if DRIVER_POOL_SIZE > 1 else None
+
+# Worker processes that parse and convert Odoo / Prompting Guide pages (default: one per core)
+if os.environ.get("SCRAPER_CONVERT_WORKERS"):
+    pipeline.convert_workers = int(os.environ["SCRAPER_CONVERT_WORKERS"])
+
+# Background jobs (POST /jobs) run this many at a time; the rest wait in line
+job_scheduler.workers = int(os.environ.get("SCRAPER_JOB_WORKERS", "2"))
+
+# How long a background job waits for the shared browser (jobs queue behind each other)
+JOB_LEASE_TIMEOUT = float(os.environ.get("SCRAPER_JOB_LEASE_TIMEOUT", str(24 * 3600)))
 
 # CORS Configuration
 origins = [
@@ -31,11 +111,49 @@ app.add_middleware(
 
 class PublicScrapeRequest(BaseModel):
     url: str
+    incremental: bool = False
+    resume: bool = False
+    retry_failed: bool = False
+    discovery: Literal["links", "sphinx"] = "links"  # Odoo: follow category links, or plan from the Sphinx search index
+
+class JobRequest(BaseModel):
+    kind: str  # "scrape" (iSAMS / Zendesk category), "odoo", "prompting-guide", "isams-developer" or "toddle"
+    url: str
+    incremental: bool = False
+    resume: bool = False
+    retry_failed: bool = False
+    discovery: Literal["links", "sphinx"] = "links"  # Odoo only, as for /scrape-odoo
 
 class PublicScrapeResponse(BaseModel):
     success: bool
     markdown_content: str
     message: str
+    changes: Optional[dict] = None
+
+def start_changes(url, incremental):
+    """Return a ManifestRun for incremental scrapes, or None for a full scrape."""
+    return manifest.start_run(url) if incremental else None
+
+def finish_changes(changes):
+    return changes.finish() if changes else None
+
+def start_frontier(kind, url, request, job=None):
+    """Open the checkpoint store for this scrape (fresh, resumed or failed-only); close it when done.
+
+    Requests fail with FrontierBusy while another scrape of the same crawl runs;
+    background jobs wait for it like they wait for the browser."""
+    frontier = open_frontier(f"{kind}:{url}", resume=request.resume, retry_failed=request.retry_failed,
+                             wait=0 if job is None else JOB_LEASE_TIMEOUT)
+    if job is not None:
+        job.track(frontier)
+    return frontier
+
+def lease_browser(label, job=None):
+    """Check out the shared browser. Requests give up after driver_leases.timeout;
+    background jobs wait their turn however long the scrapes ahead of them take."""
+    if job is None:
+        return driver_leases.lease(label)
+    return driver_leases.lease(f"job {job.id[:8]} {label}", timeout=JOB_LEASE_TIMEOUT)
 
 @app.get("/")
 def read_root():
@@ -51,60 +169,203 @@ def login(request: LoginRequest):
 
 @app.post("/launch-login")
 def launch_login():
-    success, message = auth_service.launch_login()
+    try:
+        # Restarting the browser for login must not pull it out from under a running scrape
+        with driver_leases.lease("launch-login"):
+            success, message = auth_service.launch_login()
+    except LeaseTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if success and driver_pool is not None:
+        # The pool's profile copies predate this login
+        driver_pool.refresh()
     return {"success": success, "message": message}
 
+@app.get("/browser-queue")
+def browser_queue():
+    return driver_leases.status()
+
 @app.get("/check-auth")
 def check_auth():
     success, message = auth_service.check_authentication()
+    if success and driver_pool is not None:
+        # Typically called once the user has signed in: pick the new cookies up
+        driver_pool.refresh()
     return {"success": success, "message": message}
 
+class ScrapeFailed(Exception):
+    """The scraper reported failure without raising."""
+
+def scrape_articles(request, writer=None, job=None):
+    changes = start_changes(request.category_url, request.incremental)
+    with start_frontier("scrape", request.category_url, request, job) as frontier, \
+            lease_browser("scrape", job) as driver:
+        success, message, articles, markdown = scraper_service.scrape_category(
+            request.category_url, changes, frontier, driver, writer)
+        if not success:
+            # Raised inside the lease, so a browser that died with it gets discarded
+            raise ScrapeFailed(message)
+    return markdown, message, finish_changes(changes), articles
+
+def run_scrape(request, writer=None, job=None):
+    markdown, message, changes, articles = scrape_articles(request, writer, job)
+    return markdown, message, changes
+
+def run_odoo(request, writer=None, job=None):
+    changes = start_changes(request.url, request.incremental)
+    with start_frontier("odoo", request.url, request, job) as frontier:
+        markdown = scrape_odoo(request.url, changes=changes, discovery=request.discovery, frontier=frontier, writer=writer)
+    return markdown, "Successfully scraped Odoo docs", finish_changes(changes)
+
+def run_prompting_guide(request, writer=None, job=None):
+    changes = start_changes(request.url, request.incremental)
+    with start_frontier("prompting-guide", request.url, request, job) as frontier:
+        markdown = scrape_prompting_guide(request.url, changes=changes, frontier=frontier, writer=writer)
+    return markdown, "Successfully scraped Prompting Guide", finish_changes(changes)
+
+def run_isams_developer(request, writer=None, job=None):
+    changes = start_changes(request.url, request.incremental)
+    with start_frontier("isams-developer", request.url, request, job) as frontier, \
+            lease_browser("scrape-isams-developer", job) as driver:
+        markdown = scrape_isams_developer(request.url, driver, changes, frontier, driver_pool, writer)
+    return markdown, "Successfully scraped iSAMS Developer Docs", finish_changes(changes)
+
+def run_toddle(request, writer=None, job=None):
+    changes = start_changes(request.url, request.incremental)
+    with start_frontier("toddle", request.url, request, job) as frontier, \
+            lease_browser("scrape-toddle", job) as driver:
+        articles_list, markdown = scrape_toddle(request.url, driver, changes, frontier, driver_pool, writer)
+    return markdown, "Successfully scraped Toddle Documentation", finish_changes(changes)
+
+job_scheduler.register("scrape", run_scrape, browser=True)
+job_scheduler.register("odoo", run_odoo)
+job_scheduler.register("prompting-guide", run_prompting_guide)
+job_scheduler.register("isams-developer", run_isams_developer, browser=True)
+job_scheduler.register("toddle", run_toddle, browser=True)
+
 @app.post("/scrape", response_model=ScrapeResponse)
 def scrape(request: ScrapeRequest):
-    success, message, articles, markdown = scraper_service.scrape_category(request.category_url)
-    if not success:
-        raise HTTPException(status_code=500, detail=message)
+    try:
+        markdown, message, changes, articles = scrape_articles(request)
+    except FrontierBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except LeaseTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ScrapeFailed as e:
+        raise HTTPException(status_code=500, detail=str(e))
     return ScrapeResponse(
         success=True, 
         message=message, 
         articles=articles, 
-        markdown_content=markdown
+        markdown_content=markdown,
+        changes=changes
     )
 
-@app.post("/scrape-odoo", response_model=PublicScrapeResponse)
-def api_scrape_odoo(request: PublicScrapeRequest):
+def public_scrape(run, request):
     try:
-        markdown = scrape_odoo(request.url)
-        return PublicScrapeResponse(success=True, markdown_content=markdown, message="Successfully scraped Odoo docs")
+        markdown, message, changes = run(request)
+        return PublicScrapeResponse(success=True, markdown_content=markdown, message=message, changes=changes)
+    except FrontierBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except LeaseTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/scrape-odoo", response_model=PublicScrapeResponse)
+def api_scrape_odoo(request: PublicScrapeRequest):
+    return public_scrape(run_odoo, request)
+
 @app.post("/scrape-prompting-guide", response_model=PublicScrapeResponse)
 def api_scrape_prompting_guide(request: PublicScrapeRequest):
-    try:
-        markdown = scrape_prompting_guide(request.url)
-        return PublicScrapeResponse(success=True, markdown_content=markdown, message="Successfully scraped Prompting Guide")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return public_scrape(run_prompting_guide, request)
 
 @app.post("/scrape-isams-developer", response_model=PublicScrapeResponse)
 def api_scrape_isams_developer(request: PublicScrapeRequest):
-    try:
-        driver = auth_service.get_driver()
-        markdown = scrape_isams_developer(request.url, driver)
-        return PublicScrapeResponse(success=True, markdown_content=markdown, message="Successfully scraped iSAMS Developer Docs")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return public_scrape(run_isams_developer, request)
 
 @app.post("/scrape-toddle", response_model=PublicScrapeResponse)
 def api_scrape_toddle(request: PublicScrapeRequest):
+    return public_scrape(run_toddle, request)
+
+def stream_scrape(kind, run, request, format):
+    """Run the scrape on its own thread and answer with its articles as they are scraped."""
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown stream format: {format} (expected one of {', '.join(MEDIA_TYPES)})")
+    stream = ArticleStream(kind)
+
+    def work():
+        try:
+            markdown, message, changes = run(request, stream)
+        except FrontierBusy as e:
+            stream.fail(409, str(e))
+        except LeaseTimeout as e:
+            stream.fail(503, str(e))
+        except Exception as e:
+            stream.fail(500, str(e))
+        else:
+            stream.finish(message, changes, markdown)
+
+    threading.Thread(target=work, name=f"stream-{kind}", daemon=True).start()
+    return StreamingResponse(stream.events(format), media_type=MEDIA_TYPES[format],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/scrape/stream")
+def scrape_stream(request: ScrapeRequest, format: str = "ndjson"):
+    return stream_scrape("scrape", run_scrape, request, format)
+
+@app.post("/scrape-odoo/stream")
+def api_scrape_odoo_stream(request: PublicScrapeRequest, format: str = "ndjson"):
+    return stream_scrape("odoo", run_odoo, request, format)
+
+@app.post("/scrape-prompting-guide/stream")
+def api_scrape_prompting_guide_stream(request: PublicScrapeRequest, format: str = "ndjson"):
+    return stream_scrape("prompting-guide", run_prompting_guide, request, format)
+
+@app.post("/scrape-isams-developer/stream")
+def api_scrape_isams_developer_stream(request: PublicScrapeRequest, format: str = "ndjson"):
+    return stream_scrape("isams-developer", run_isams_developer, request, format)
+
+@app.post("/scrape-toddle/stream")
+def api_scrape_toddle_stream(request: PublicScrapeRequest, format: str = "ndjson"):
+    return stream_scrape("toddle", run_toddle, request, format)
+
+@app.post("/jobs")
+def create_job(request: JobRequest):
+    """Queue a scrape and return its id without waiting for it."""
+    options = request.model_dump(include={"incremental", "resume", "retry_failed"})
+    if request.kind == "scrape":
+        scrape_request = ScrapeRequest(category_url=request.url, **options)
+    else:
+        scrape_request = PublicScrapeRequest(url=request.url, discovery=request.discovery, **options)
     try:
-        driver = auth_service.get_driver()
-        articles_list, markdown = scrape_toddle(request.url, driver)
-        return PublicScrapeResponse(success=True, markdown_content=markdown, message="Successfully scraped Toddle Documentation")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        job = job_scheduler.submit(request.kind, request.url, scrape_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{e} (expected one of {', '.join(job_scheduler.kinds())})")
+    return job.status()
+
+@app.get("/jobs")
+def list_jobs():
+    return [job.status() for job in job_scheduler.list()]
+
+def find_job(job_id):
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return find_job(job_id).status()
 
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """The job's Markdown export; a failed job's holds what was scraped before it failed."""
+    job = find_job(job_id)
+    if job.state not in (JOB_DONE, JOB_FAILED):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.state}")
+    if not os.path.exists(job.result_path):
+        raise HTTPException(status_code=404, detail=job.message or "Job produced no result")
+    return FileResponse(job.result_path, media_type="text/markdown", filename=f"{job.kind}-{job.id}.md")
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8002, reload=False)
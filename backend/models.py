@@ -11,6 +11,9 @@ class LoginResponse(BaseModel):
 
 class ScrapeRequest(BaseModel):
     category_url: str
+    incremental: bool = False  # Only return articles that changed since the last run
+    resume: bool = False  # Continue an interrupted run from its checkpoint
+    retry_failed: bool = False  # Re-run only the articles that failed last time
 
 class Article(BaseModel):
     module_name: str
@@ -34,3 +37,4 @@ class ScrapeResponse(BaseModel):
     message: str
     articles: List[Article] = []
     markdown_content: str = ""
+    changes: Optional[dict] = None  # added / changed / removed summary for incremental scrapes
@@ -0,0 +1,97 @@
+"""Minimal Chrome profile holding only what the scrapers' logins need.
+
+chrome_profile keeps growing with caches, history and models (hundreds of MB),
+and every Chrome start reads it. The template keeps just the cookie stores,
+Local Storage and the IndexedDB databases of the auth hosts, plus Local State,
+which holds the cookie encryption key on Windows. Scraping drivers start from
+a throwaway copy of it, on tmpfs where available.
+
+Build or refresh it by hand with `python profile_template.py`. In slim mode
+(SCRAPER_PROFILE_MODE=slim) it is also rebuilt automatically whenever
+chrome_profile's cookies are newer, e.g. after a new login.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import logging
+
+from scrapers.http_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(CACHE_DIR, 'profile_template')
+
+# Paths relative to the profile root that carry the login state
+AUTH_PROFILE_PATHS = [
+    'Local State',
+    os.path.join('Default', 'Cookies'),
+    os.path.join('Default', 'Cookies-journal'),
+    os.path.join('Default', 'Network', 'Cookies'),
+    os.path.join('Default', 'Network', 'Cookies-journal'),
+    os.path.join('Default', 'Local Storage'),
+]
+
+# IndexedDB databases are stored per origin; keep only those of the sites we log in to
+AUTH_HOSTS = ('toddleapp.com', 'intercom', 'isams', 'zendesk', 'readme')
+
+_lock = threading.Lock()
+
+def _cookie_mtime(profile_dir):
+    paths = [os.path.join(profile_dir, 'Default', 'Network', 'Cookies'),
+             os.path.join(profile_dir, 'Default', 'Cookies')]
+    return max((os.path.getmtime(p) for p in paths if os.path.exists(p)), default=0)
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def build_template(source_dir, template_dir=TEMPLATE_DIR):
+    """Copy the auth-relevant parts of source_dir into a fresh template_dir."""
+    staging = template_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    for rel_path in AUTH_PROFILE_PATHS:
+        src = os.path.join(source_dir, rel_path)
+        dst = os.path.join(staging, rel_path)
+        if os.path.isdir(src):
+            shutil.copytree(src, dst, ignore=shutil.ignore_patterns('LOCK'))
+        elif os.path.exists(src):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(src, dst)
+
+    indexeddb = os.path.join(source_dir, 'Default', 'IndexedDB')
+    if os.path.isdir(indexeddb):
+        for name in os.listdir(indexeddb):
+            if any(host in name for host in AUTH_HOSTS):
+                shutil.copytree(os.path.join(indexeddb, name),
+                                os.path.join(staging, 'Default', 'IndexedDB', name),
+                                ignore=shutil.ignore_patterns('LOCK'))
+
+    # Swap in the new template in one step so a concurrent clone never sees half of it
+    shutil.rmtree(template_dir, ignore_errors=True)
+    os.replace(staging, template_dir)
+    logger.info(f"Built profile template {template_dir} ({_dir_size(template_dir) / 1e6:.1f} MB "
+                f"from {_dir_size(source_dir) / 1e6:.1f} MB)")
+
+def refresh_template(source_dir, template_dir=TEMPLATE_DIR):
+    """Rebuild the template if it is missing or older than source_dir's cookies."""
+    with _lock:
+        if not os.path.isdir(template_dir) or _cookie_mtime(source_dir) > _cookie_mtime(template_dir):
+            build_template(source_dir, template_dir)
+
+def scratch_root():
+    """Directory for throwaway profiles: /dev/shm (tmpfs) when usable, else the system temp dir."""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+def scratch_profile(source_dir, prefix='scraper_profile_'):
+    """Return a new throwaway profile directory cloned from the (refreshed) template."""
+    refresh_template(source_dir)
+    path = tempfile.mkdtemp(prefix=prefix, dir=scratch_root())
+    shutil.copytree(TEMPLATE_DIR, path, dirs_exist_ok=True)
+    return path
+
+if __name__ == '__main__':
+    from auth_service import auth_service
+    build_template(auth_service.user_data_dir)
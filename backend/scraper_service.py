@@ -1,7 +1,10 @@
 import requests
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import Tag, NavigableString
 from auth_service import auth_service
-import time
+from scrapers.browser import navigate, page_region, prefetch, wait_until_ready
+from scrapers.frontier import run_tracked
+from scrapers.html_parser import parse
+from scrapers.markdown_writer import MarkdownWriter
 from models import Article
 import logging
 import re
@@ -9,17 +12,17 @@ import re
 logger = logging.getLogger(__name__)
 
 class ScraperService:
-    def scrape_category(self, category_url: str):
+    def scrape_category(self, category_url: str, changes=None, frontier=None, driver=None, writer=None):
         # Smart Routing: Detect if this is actually a Toddle URL
         if "toddleapp.com" in category_url:
             logger.info(f"Toddle URL detected in iSAMS scraper: {category_url}. Redirecting...")
             from scrapers.toddle_scraper import scrape_toddle
-            driver = auth_service.get_driver()
+            driver = driver or auth_service.get_driver()
             if not driver:
                 return False, "Browser not initialized. Please click 'Initialize' in the browser or 'Launch Login' first.", [], ""
             
             try:
-                articles_list, markdown = scrape_toddle(category_url, driver)
+                articles_list, markdown = scrape_toddle(category_url, driver, changes, frontier, writer=writer)
                 if "Error:" in markdown:
                     return False, markdown, [], ""
                 
@@ -41,18 +44,18 @@ class ScraperService:
                 logger.error(f"Toddle delegation error: {str(e)}")
                 return False, f"Toddle extraction failed: {str(e)}", [], ""
 
-        driver = auth_service.get_driver()
+        driver = driver or auth_service.get_driver()
         if not driver:
             return False, "Browser not initialized. Please click 'Initialize' or 'Launch Login' first.", [], ""
 
         try:
             # Check if driver is already on the page or needs to navigate
             if driver.current_url != category_url:
-                driver.get(category_url)
-                time.sleep(3) # Wait for page load
+                navigate(driver, category_url)
+                wait_until_ready(driver, 'zendesk_category') # Wait for page load
             
             # Get all article links
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = parse(driver.page_source)
             
             # Try to find article links. This is a heuristic for Zendesk category pages.
             article_links = []
@@ -74,26 +77,32 @@ class ScraperService:
                 else:
                     return False, "No articles found on this page. If this is a single article, ensure the URL contains '/articles/'.", [], ""
 
+            if frontier is not None:
+                frontier.add_all(article_links)
             articles = []
-            markdown_output = ""
+            writer = writer or MarkdownWriter()
             
+            prefetch(driver, article_links)
             for url in article_links:
-                article_data = self.scrape_article(driver, url)
+                record = run_tracked(frontier, url, lambda: self._dump(self.scrape_article(driver, url, changes)), changes=changes)
+                article_data = Article(**record) if record else None
                 if article_data:
+                    if changes is not None and not changes.is_delta(url):
+                        continue
                     articles.append(article_data)
-                    markdown_output += self.format_article_markdown(article_data)
+                    writer.write_article(article_data, self.format_article_markdown(article_data))
             
-            return True, f"Successfully scraped {len(articles)} articles", articles, markdown_output
+            return True, f"Successfully scraped {len(articles)} articles", articles, writer.getvalue()
 
         except Exception as e:
             logger.error(f"Scrape category error: {str(e)}")
             return False, f"Scraping failed: {str(e)}", [], ""
 
-    def scrape_article(self, driver, url):
+    def scrape_article(self, driver, url, changes=None):
         try:
-            driver.get(url)
-            time.sleep(2)
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            navigate(driver, url)
+            wait_until_ready(driver, 'zendesk_article')
+            soup = parse(page_region(driver, 'zendesk_article'), region='zendesk_article')
             
             # Extract Breadcrumbs
             breadcrumbs = [li.get_text(strip=True) for li in soup.select(".breadcrumbs li")]
@@ -115,11 +124,17 @@ class ScraperService:
                 for tag in content_div(["script", "style", "img", "video", "iframe"]):
                     tag.decompose()
                 
-                content_text = self.clean_html_structure(content_div)
+                def convert():
+                    text = self.clean_html_structure(content_div)
+                    
+                    # Final cleanup of excessive whitespace
+                    text = re.sub(r'\n\s*\n', '\n\n', text)
+                    return text.strip()
                 
-                # Final cleanup of excessive whitespace
-                content_text = re.sub(r'\n\s*\n', '\n\n', content_text)
-                content_text = content_text.strip()
+                if changes is not None:
+                    content_text = changes.convert(url, str(content_div), convert)
+                else:
+                    content_text = convert()
             
             # Extract Related Articles
             related = []
@@ -141,43 +156,49 @@ class ScraperService:
             logger.error(f"Error scraping article {url}: {str(e)}")
             return None
 
+    def _dump(self, article):
+        # Frontier records are stored as JSON
+        return article.model_dump() if article else None
+
     def clean_html_structure(self, element):
-        text = ""
         if not element:
             return ""
-        
+        parts = []
+        self._clean_into(element, parts)
+        return "".join(parts)
+
+    def _clean_into(self, element, parts):
         for child in element.contents:
             if isinstance(child, NavigableString):
                 s = str(child).strip()
                 if s:
-                    text += s + " "
+                    parts.append(s + " ")
             elif isinstance(child, Tag):
                 if child.name == 'br':
-                    text += "\n"
+                    parts.append("\n")
                 elif child.name == 'li':
-                    text += "\n- " + self.clean_html_structure(child).strip() + "\n"
+                    parts.append("\n- " + self.clean_html_structure(child).strip() + "\n")
                 elif child.name in ['p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'section', 'article']:
-                    text += "\n" + self.clean_html_structure(child).strip() + "\n"
+                    parts.append("\n" + self.clean_html_structure(child).strip() + "\n")
                 elif child.name in ['ul', 'ol']:
-                    text += "\n" + self.clean_html_structure(child).strip() + "\n"
+                    parts.append("\n" + self.clean_html_structure(child).strip() + "\n")
                 else:
                     # Inline tags (span, a, b, i, etc.)
-                    text += self.clean_html_structure(child)
-        
-        return text
+                    self._clean_into(child, parts)
 
     def format_article_markdown(self, article: Article) -> str:
-        md = "---\n"
-        md += f"## Module Name\n{article.module_name}\n"
-        md += f"## Category Level 1\n{article.category_level_1}\n"
-        md += f"## Category Level 2\n{article.category_level_2}\n"
-        md += f"## Article Name\n{article.article_name}\n"
-        md += f"## Article URL\n{article.article_url}\n"
-        md += f"## Content\n{article.content}\n"
-        md += "## Related Articles\n"
-        for rel in article.related_articles:
-            md += f"- {rel}\n"
-        md += "---\n\n"
-        return md
+        lines = [
+            "---\n",
+            f"## Module Name\n{article.module_name}\n",
+            f"## Category Level 1\n{article.category_level_1}\n",
+            f"## Category Level 2\n{article.category_level_2}\n",
+            f"## Article Name\n{article.article_name}\n",
+            f"## Article URL\n{article.article_url}\n",
+            f"## Content\n{article.content}\n",
+            "## Related Articles\n",
+        ]
+        lines += [f"- {rel}\n" for rel in article.related_articles]
+        lines.append("---\n\n")
+        return "".join(lines)
 
 scraper_service = ScraperService()
@@ -0,0 +1,182 @@
+import logging
+import threading
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from scrapers.html_parser import REGIONS
+from scrapers.politeness import politeness
+
+logger = logging.getLogger(__name__)
+
+# Per-site readiness rules: the page is ready once `selector` matches and the DOM
+# has not mutated for `quiet_ms`. `deadline` (seconds) bounds the whole wait.
+READINESS = {
+    'toddle_collection': {'selector': 'a[href*="/articles/"]', 'quiet_ms': 300, 'deadline': 10},
+    'toddle_article': {
+        'selector': '.intercom-article-body, article, .article-body, [role="main"], .article-content',
+        'quiet_ms': 300, 'deadline': 10,
+    },
+    'isams_developer': {'selector': '.rm-Article', 'quiet_ms': 500, 'deadline': 15},
+    'zendesk_category': {'selector': 'a[href*="/articles/"]', 'quiet_ms': 300, 'deadline': 10},
+    'zendesk_article': {'selector': '.article-body, article', 'quiet_ms': 300, 'deadline': 10},
+}
+
+# Resources the converters never look at: images, fonts, media, analytics and chat widgets.
+# Patterns use the wildcard syntax of CDP Network.setBlockedURLs.
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mov', '*.mp3', '*.m3u8',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*segment.io*', '*segment.com*', '*hotjar.com*', '*mixpanel.com*', '*fullstory.com*',
+    '*sentry.io*', '*clarity.ms*', '*facebook.net*', '*youtube.com*', '*vimeo.com*', '*wistia.com*',
+    '*widget.intercom.io*', '*js.intercomcdn.com*', '*nexus-websocket*.intercom.io*',
+]
+
+# Browser profiles for scraping drivers. 'lean' returns from driver.get at
+# DOMContentLoaded and never downloads the blocked resources; wait_until_ready
+# then waits for the content itself.
+BROWSER_PROFILES = {
+    'full': {'page_load_strategy': 'normal', 'page_load_timeout': 60, 'blocked_urls': []},
+    'lean': {'page_load_strategy': 'eager', 'page_load_timeout': 30, 'blocked_urls': BLOCKED_URLS},
+}
+
+def apply_profile(driver, profile):
+    """Apply a BROWSER_PROFILES entry's timeouts and URL blocking to a started driver."""
+    driver.set_page_load_timeout(profile['page_load_timeout'])
+    if profile['blocked_urls']:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': profile['blocked_urls']})
+        except Exception as e:
+            logger.warning(f"Could not enable resource blocking: {e}")
+
+WAIT_FOR_READY_JS = """
+var selector = arguments[0], quietMs = arguments[1], deadlineMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = Date.now(), finished = false;
+
+function finish(status) {
+    if (finished) return;
+    finished = true;
+    done({status: status, elapsed: Date.now() - start});
+}
+
+function waitForQuiet() {
+    var timer = null;
+    var observer = new MutationObserver(function () {
+        clearTimeout(timer);
+        timer = setTimeout(settled, quietMs);
+    });
+    function settled() { observer.disconnect(); finish('ready'); }
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(settled, quietMs);
+    setTimeout(function () { observer.disconnect(); finish('unsettled'); },
+               Math.max(0, deadlineMs - (Date.now() - start)));
+}
+
+(function poll() {
+    if (document.readyState !== 'loading' && document.querySelector(selector)) return waitForQuiet();
+    if (Date.now() - start > deadlineMs) return finish('missing');
+    setTimeout(poll, 50);
+})();
+"""
+
+# outerHTML of every element matching the selector, skipping those inside one already taken
+EXTRACT_REGIONS_JS = """
+var kept = [];
+document.querySelectorAll(arguments[0]).forEach(function (el) {
+    if (!kept.some(function (k) { return k.contains(el); })) kept.push(el);
+});
+return kept.map(function (el) { return el.outerHTML; }).join('');
+"""
+
+def is_replay(driver):
+    """True when the driver serves pages from a PageArchive instead of a real browser."""
+    return getattr(driver, 'replay', False)
+
+def is_hybrid(driver):
+    """True for a HybridDriver, which fetches over HTTP and paces its own requests."""
+    return getattr(driver, 'hybrid', False)
+
+# Sessions whose navigation raised a WebDriver error. The scrapers catch errors
+# per page, so whoever hands the browser out checks this when it comes back.
+_failed_sessions = set()
+_failed_lock = threading.Lock()
+
+def session_failed(driver):
+    """True if a navigation of driver has failed since the last call (then cleared)."""
+    session_id = getattr(driver, 'session_id', None)
+    with _failed_lock:
+        if session_id in _failed_sessions:
+            _failed_sessions.discard(session_id)
+            return True
+    return False
+
+def navigate(driver, url):
+    """driver.get(url), paced by the shared per-host politeness limiter."""
+    if is_replay(driver) or is_hybrid(driver):
+        return driver.get(url)
+    with politeness.limiter(url).slot():
+        try:
+            return driver.get(url)
+        except TimeoutException:
+            # Stop whatever is still loading; wait_until_ready decides whether the content made it
+            logger.warning(f"Page load timed out: {url}")
+            driver.execute_script("window.stop();")
+        except WebDriverException:
+            # Possibly a crashed browser: have it probed when it is handed back
+            with _failed_lock:
+                _failed_sessions.add(getattr(driver, 'session_id', None))
+            raise
+
+def page_region(driver, site):
+    """HTML of the current page's extraction region (html_parser.REGIONS[site]), in document order.
+
+    Live browsers hand over just those elements instead of the whole page_source.
+    Pages that are already local (replay, hybrid HTTP) and recording drivers,
+    which need the full page for the archive, return page_source.
+    """
+    if is_replay(driver) or getattr(driver, 'records', False) or (is_hybrid(driver) and driver.over_http):
+        return driver.page_source
+    try:
+        html = driver.execute_script(EXTRACT_REGIONS_JS, ', '.join(REGIONS[site]))
+    except Exception as e:
+        logger.warning(f"Region extraction failed on {driver.current_url}: {e}")
+        html = None
+    if not html:
+        return driver.page_source
+    return f"<html><body>{html}</body></html>"
+
+def prefetch(driver, urls):
+    """Let a BatchFetchDriver pull urls in one round trip; a no-op for other drivers."""
+    if hasattr(driver, 'prefetch'):
+        driver.prefetch(list(urls))
+
+def wait_until_ready(driver, site):
+    """Wait until the site's content container exists and the DOM has gone quiet.
+
+    Returns 'ready', 'unsettled' (content present but still mutating at the
+    deadline), 'missing' (content never appeared) or 'error'.
+    """
+    if is_replay(driver):
+        return 'ready'
+    rules = READINESS[site]
+    if is_hybrid(driver) and driver.over_http:
+        if driver.has_content(rules['selector']):
+            return 'ready'
+        # The HTML is an empty shell that JavaScript fills in: render it for real
+        logger.info(f"{site} page needs JavaScript, rendering in the browser: {driver.current_url}")
+        driver.render()
+    try:
+        driver.set_script_timeout(rules['deadline'] + 5)
+        result = driver.execute_async_script(
+            WAIT_FOR_READY_JS, rules['selector'], rules['quiet_ms'], int(rules['deadline'] * 1000)
+        )
+    except Exception as e:
+        logger.warning(f"Readiness check failed on {driver.current_url}: {e}")
+        return 'error'
+    status = (result or {}).get('status', 'error')
+    if status != 'ready':
+        logger.warning(f"Page not ready ({status}) for {site}: {driver.current_url}")
+    return status
@@ -0,0 +1,260 @@
+"""SQLite-backed crawl frontier shared by all scrapers.
+
+Each crawl job (e.g. "toddle:<collection url>") tracks every URL it has seen
+together with its state and, once done, the article record it produced. A run
+that dies half way can be resumed: finished URLs are served from the store,
+URLs that were in flight are queued again, and `retry_failed` re-queues only
+the failures of a previous run.
+
+Only one run at a time may hold a job's frontier: open_frontier claims it
+and close() gives it back, so a second scrape of the same crawl cannot reset
+or interleave with the first.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from scrapers.http_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRONTIER_PATH = os.path.join(CACHE_DIR, 'frontier.sqlite3')
+
+QUEUED = 'queued'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+class FrontierBusy(Exception):
+    """Another run is using this job's frontier."""
+
+_claimed = set()                # jobs whose frontier is held by a run
+_claims = threading.Condition()
+
+def _claim(job, wait):
+    deadline = time.monotonic() + wait
+    with _claims:
+        while job in _claimed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FrontierBusy(f"Another scrape of {job} is already running")
+            _claims.wait(remaining)
+        _claimed.add(job)
+
+def _release(job):
+    with _claims:
+        _claimed.discard(job)
+        _claims.notify_all()
+
+class CrawlFrontier:
+    def __init__(self, job, path=DEFAULT_FRONTIER_PATH):
+        self.job = job
+        self.path = path
+        self._lock = threading.Lock()
+        self._final_counts = {}
+        self._claimed = False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " job TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " state TEXT NOT NULL,"
+            " meta TEXT,"
+            " record TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (job, url))"
+        )
+        # Anything still in flight belongs to a run that crashed: queue it again
+        self._conn.execute(
+            "UPDATE frontier SET state = ? WHERE job = ? AND state = ?", (QUEUED, job, IN_FLIGHT)
+        )
+        self._conn.commit()
+
+    def add(self, url, meta=None):
+        """Queue url unless the job already knows it. Returns True if it was new."""
+        with self._lock:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM frontier WHERE job = ?", (self.job,)
+            ).fetchone()[0]
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO frontier (job, url, seq, state, meta, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.job, url, seq, QUEUED, json.dumps(meta), time.time())
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def add_all(self, urls, meta=None):
+        """Queue every url the job does not know yet, in order. Returns how many were new."""
+        now = time.time()
+        with self._lock:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM frontier WHERE job = ?", (self.job,)
+            ).fetchone()[0]
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (job, url, seq, state, meta, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.job, url, seq + i, QUEUED, json.dumps(meta), now) for i, url in enumerate(urls)]
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def state(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM frontier WHERE job = ? AND url = ?", (self.job, url)
+            ).fetchone()
+        return row[0] if row else None
+
+    def meta(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT meta FROM frontier WHERE job = ? AND url = ?", (self.job, url)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def record(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM frontier WHERE job = ? AND url = ?", (self.job, url)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def entries(self, state=None):
+        """Return [(url, state, meta, record)] in the order the URLs were first queued."""
+        query = "SELECT url, state, meta, record FROM frontier WHERE job = ?"
+        params = [self.job]
+        if state:
+            query += " AND state = ?"
+            params.append(state)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY seq", params).fetchall()
+        return [(url, st, json.loads(meta) if meta else None, json.loads(record) if record else None)
+                for url, st, meta, record in rows]
+
+    def start(self, url):
+        self._update(url, "state = ?, attempts = attempts + 1", (IN_FLIGHT,))
+
+    def complete(self, url, record):
+        self._update(url, "state = ?, record = ?, error = NULL", (DONE, json.dumps(record)))
+
+    def fail(self, url, error):
+        self._update(url, "state = ?, error = ?", (FAILED, str(error)))
+
+    def _update(self, url, assignments, params):
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE frontier SET {assignments}, updated_at = ? WHERE job = ? AND url = ?",
+                params + (time.time(), self.job, url)
+            )
+            self._conn.commit()
+
+    def retry_failed(self):
+        """Re-queue every failed URL of this job. Returns how many were re-queued."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE frontier SET state = ?, error = NULL WHERE job = ? AND state = ?",
+                (QUEUED, self.job, FAILED)
+            )
+            self._conn.commit()
+        logger.info(f"Re-queued {cursor.rowcount} failed URLs for {self.job}")
+        return cursor.rowcount
+
+    def reset(self):
+        """Forget everything about this job so the next run starts from scratch."""
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier WHERE job = ?", (self.job,))
+            self._conn.commit()
+
+    def counts(self):
+        """URLs per state. Still answers after close(), with the counts at that point."""
+        with self._lock:
+            if self._conn is None:
+                return dict(self._final_counts)
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM frontier WHERE job = ? GROUP BY state", (self.job,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        final_counts = self.counts() if self._conn is not None else self._final_counts
+        with self._lock:
+            if self._conn is not None:
+                self._final_counts = final_counts
+                self._conn.close()
+                self._conn = None
+            if self._claimed:
+                self._claimed = False
+                _release(self.job)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_frontier(job, resume=False, retry_failed=False, wait=0):
+    """Open the checkpoint store for a job and hold it until close().
+
+    A fresh run (neither resume nor retry_failed) clears the job's previous
+    state. retry_failed keeps finished URLs and re-queues only the failures.
+    Raises FrontierBusy if another run still holds the job after wait seconds.
+    """
+    _claim(job, wait)
+    try:
+        frontier = CrawlFrontier(job)
+        if retry_failed:
+            frontier.retry_failed()
+        elif not resume:
+            frontier.reset()
+    except BaseException:
+        _release(job)
+        raise
+    frontier._claimed = True
+    return frontier
+
+def run_tracked(frontier, url, work, meta=None, changes=None):
+    """Produce url's record through the frontier.
+
+    Done URLs return their stored record and failed URLs return None without
+    re-running. Anything else runs work() and stores its result; a None
+    result or an exception marks the URL failed. Without a frontier this is
+    just work(). With a ManifestRun as changes, served records are kept in
+    the run and failures reported to it, so neither counts as removed.
+    """
+    if frontier is not None:
+        state = frontier.state(url)
+        if state is None:
+            frontier.add(url, meta)
+        elif state == DONE:
+            record = frontier.record(url)
+            if changes is not None and record:
+                changes.keep(url, record.get('content'))
+            return record
+        elif state == FAILED:
+            if changes is not None:
+                changes.mark_failed(url)
+            return None
+        frontier.start(url)
+
+    try:
+        record = work()
+    except Exception as e:
+        if frontier is not None:
+            frontier.fail(url, e)
+        if changes is not None:
+            changes.mark_failed(url)
+        raise
+    if record is None:
+        if frontier is not None:
+            frontier.fail(url, "no result")
+        if changes is not None:
+            changes.mark_failed(url)
+    elif frontier is not None:
+        frontier.complete(url, record)
+    return record
@@ -0,0 +1,135 @@
+"""One place to choose how HTML gets parsed.
+
+Scrapers call `parse()` instead of building BeautifulSoup themselves, so the
+tree builder can be switched in one spot: 'lxml' (C, used when installed) or
+'html.parser' (pure Python, always available). Set SCRAPER_HTML_PARSER to
+force one. Questions that do not need a whole bs4 tree, such as whether a
+selector matches or what the HTML of one region is, go through selectolax's
+lexbor engine when it is installed (`matches`, `select_html`).
+
+Each site also has an extraction region: the few containers its scraper
+actually reads. `parse(markup, region=site)` builds only those subtrees, and
+browser.page_region pulls just their outerHTML out of a live browser.
+
+benchmark_parsers.py compares the backends on the checked-in debug pages.
+"""
+import os
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+BACKENDS = ('html.parser', 'lxml')
+
+backend = os.environ.get('SCRAPER_HTML_PARSER') or ('lxml' if HAVE_LXML else 'html.parser')
+
+# Containers each scraper reads from an article page: title, breadcrumbs, content and
+# their fallbacks. Only simple selectors (tag, .class, #id, [attr="value"] and
+# combinations of those) so they work both as CSS and as a parse-time filter.
+REGIONS = {
+    'odoo_article': ['h1', 'article.doc-body', 'div[role="main"]'],
+    'prompting_guide_article': ['h1', 'main'],
+    'toddle_article': [
+        'nav', '.intercom-breadcrumb', '.breadcrumb', '[data-testid="breadcrumb"]',
+        'h1', '.intercom-article-header', '.article-title', '.intercom-article-title',
+        '.intercom-article-body', 'article', '.article-body', '[role="main"]', '.article-content',
+    ],
+    'isams_developer': [
+        '.rm-Breadcrumbs', 'h1', '.rm-TitleSection', '.rm-Article', 'article', '#content',
+        '.rm-Content', '.markdown-body',
+    ],
+    'isams_developer_sidebar': ['#hub-sidebar'],
+    'zendesk_article': ['.breadcrumbs', 'h1', '.article-body', 'article', '.recent-articles', '.related-articles'],
+}
+
+_SIMPLE_SELECTOR = re.compile(r'^(?P<tag>[a-z][a-z0-9]*)?(?P<rest>(?:\.[\w-]+|#[\w-]+|\[[\w-]+="[^"]*"\])*)$')
+_SELECTOR_PART = re.compile(r'\.([\w-]+)|#([\w-]+)|\[([\w-]+)="([^"]*)"\]')
+
+def _compile_selector(selector):
+    match = _SIMPLE_SELECTOR.match(selector)
+    if not match:
+        raise ValueError(f"Not a simple selector: {selector}")
+    classes, attrs = set(), {}
+    for cls, id_, name, value in _SELECTOR_PART.findall(match.group('rest')):
+        if cls:
+            classes.add(cls)
+        elif id_:
+            attrs['id'] = id_
+        else:
+            attrs[name] = value
+    return match.group('tag'), classes, attrs
+
+class RegionStrainer(SoupStrainer):
+    """Keep only the elements matching any of a list of simple selectors, with their subtrees."""
+
+    def __init__(self, selectors):
+        super().__init__()
+        self.rules = [_compile_selector(selector) for selector in selectors]
+
+    def _matches(self, name, attrs):
+        attrs = attrs or {}
+        classes = attrs.get('class') or []
+        if isinstance(classes, str):
+            classes = classes.split()
+        for tag, wanted_classes, wanted_attrs in self.rules:
+            if tag and tag != name:
+                continue
+            if not wanted_classes.issubset(classes):
+                continue
+            if all(attrs.get(key) == value for key, value in wanted_attrs.items()):
+                return True
+        return False
+
+    # BeautifulSoup 4.13+ asks these while parsing
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self._matches(name, attrs)
+
+    def allow_string_creation(self, string):
+        return False
+
+    # BeautifulSoup < 4.13
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return self._matches(markup_name, markup_attrs)
+
+def parse(markup, parser=None, region=None):
+    """Parse a page (str or bytes) into a BeautifulSoup tree with the configured backend.
+
+    With region (a REGIONS key) only that site's extraction region is built.
+    """
+    parse_only = RegionStrainer(REGIONS[region]) if region else None
+    return BeautifulSoup(markup, parser or backend, parse_only=parse_only)
+
+def matches(markup, selector):
+    """True if any element of markup matches the CSS selector."""
+    if LexborHTMLParser is not None:
+        return LexborHTMLParser(markup).css_first(selector) is not None
+    return parse(markup).select_one(selector) is not None
+
+def select_html(markup, selectors):
+    """Outer HTML of the first element matching the first selector that matches, or None.
+
+    selectors are tried in order, like the scrapers' own fallback lists.
+    """
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(markup)
+        for selector in selectors:
+            node = tree.css_first(selector)
+            if node is not None:
+                return node.html
+        return None
+    soup = parse(markup)
+    for selector in selectors:
+        node = soup.select_one(selector)
+        if node is not None:
+            return str(node)
+    return None
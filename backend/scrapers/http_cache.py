@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(PROJECT_DIR, '.cache')
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, 'http_cache.sqlite3')
+
+# Headers a response may vary on and still be the same page for everyone
+SHAREABLE_VARY = {'accept-encoding'}
+
+def is_shareable(response):
+    """True if the response may be stored under its URL and served to any later request."""
+    cache_control = {directive.split('=')[0].strip().lower()
+                     for directive in response.headers.get('Cache-Control', '').split(',')}
+    if cache_control & {'private', 'no-store'}:
+        return False
+    vary = {header.strip().lower() for header in response.headers.get('Vary', '').split(',') if header.strip()}
+    return vary <= SHAREABLE_VARY
+
+class HttpCache:
+    """On-disk store of response bodies and their validators (ETag / Last-Modified).
+
+    The total size of stored bodies is capped at max_bytes; when it is exceeded
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " content_type TEXT,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._conn.commit()
+
+    def validators(self, url):
+        """Return the conditional request headers to send for url."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def load(self, url):
+        """Return (body, content_type) for url and mark it as recently used, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, content_type FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return bytes(row[0]), row[1]
+
+    def store(self, url, response):
+        """Remember a 200 response if it carries a validator we can revalidate with.
+
+        Responses meant for one user only (Cache-Control private / no-store, or
+        varying on a request header such as Cookie) are never written, as entries are keyed
+        by URL alone.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        if not is_shareable(response):
+            return
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, content_type, body, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, response.headers.get('Content-Type'), body, len(body), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            evicted += 1
+        logger.info(f"HTTP cache evicted {evicted} entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,165 @@
+import threading
+import logging
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+from scrapers.http_cache import HttpCache
+from scrapers.politeness import politeness as default_politeness
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+def _accept_encoding():
+    # urllib3 only decodes brotli when one of these packages is installed,
+    # so only advertise it when we can actually read the response.
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+            return 'gzip, deflate, br'
+        except ImportError:
+            continue
+    return 'gzip, deflate'
+
+class HttpClient:
+    """Pooled keep-alive HTTP client shared by the requests-based scrapers.
+
+    One `requests.Session` is kept per host so every page on that host reuses
+    the same TCP/TLS connections instead of paying a new handshake each time.
+    When a cache is attached, GETs are sent as conditional requests and a 304
+    is answered from the stored body; requests that carry browser cookies
+    bypass the cache, since their pages belong to one login. When a
+    Politeness policy is attached,
+    every request is paced per host and 429/5xx responses are retried.
+    """
+
+    def __init__(self, timeout=(5, 30), pool_size=16, user_agent=DEFAULT_USER_AGENT, cache=None, politeness=None):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.user_agent = user_agent
+        self.cache = cache
+        self.politeness = politeness
+        self.archive = None
+        self.archive_mode = None
+        # Cookies handed over from an authenticated browser (see scrapers/hybrid_driver.py)
+        self.cookies = RequestsCookieJar()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._new_session()
+                self._sessions[host] = session
+            return session
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'User-Agent': self.user_agent,
+            'Accept-Encoding': _accept_encoding(),
+            'Connection': 'keep-alive',
+        })
+        session.cookies.update(self.cookies)
+        return session
+
+    def set_cookies(self, cookies):
+        """Load browser cookies (Selenium/CDP dicts) into every current and future session."""
+        with self._lock:
+            for cookie in cookies:
+                self.cookies.set(
+                    cookie['name'], cookie['value'],
+                    domain=cookie.get('domain', ''), path=cookie.get('path', '/'),
+                    secure=cookie.get('secure', False),
+                )
+            for session in self._sessions.values():
+                session.cookies.update(self.cookies)
+
+    def start_recording(self, archive):
+        """Write every successful response body into a PageArchive."""
+        self.archive = archive
+        self.archive_mode = 'record'
+
+    def start_replay(self, archive):
+        """Serve every request from a PageArchive without touching the network."""
+        self.archive = archive
+        self.archive_mode = 'replay'
+
+    def get(self, url, headers=None, timeout=None):
+        if self.archive_mode == 'replay':
+            body = self.archive.load(url)
+            if body is None:
+                logger.warning(f"Page not in archive: {url}")
+                return self._synthetic_response(url, b'', status_code=404)
+            return self._synthetic_response(url, body)
+
+        response = self._fetch(url, headers, timeout)
+        if self.archive_mode == 'record' and response.status_code == 200:
+            self.archive.record(url, response.content)
+        return response
+
+    def _send(self, session, url, headers, timeout):
+        send = lambda: session.get(url, headers=headers, timeout=timeout or self.timeout)
+        if self.politeness is None:
+            return send()
+        return self.politeness.call(url, send)
+
+    def _sends_browser_cookies(self, url):
+        with self._lock:
+            if not self.cookies:
+                return False
+            return 'Cookie' in requests.Request('GET', url, cookies=self.cookies).prepare().headers
+
+    def _fetch(self, url, headers, timeout):
+        session = self.session_for(url)
+        if self.cache is None or self._sends_browser_cookies(url):
+            return self._send(session, url, headers, timeout)
+
+        request_headers = self.cache.validators(url)
+        request_headers.update(headers or {})
+        response = self._send(session, url, request_headers, timeout)
+
+        if response.status_code == 304:
+            cached = self.cache.load(url)
+            if cached is not None:
+                body, content_type = cached
+                return self._synthetic_response(url, body, headers=response.headers, content_type=content_type, source=response)
+            # The entry was evicted between building the request and reading it back
+            return self._send(session, url, headers, timeout)
+
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def _synthetic_response(self, url, body, status_code=200, headers=None, content_type=None, source=None):
+        """Build a Response for a body that did not come off the wire (cache hit or archive replay)."""
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = 'OK' if status_code == 200 else 'Not Found'
+        response.url = source.url if source is not None else url
+        response.request = source.request if source is not None else None
+        response.headers = CaseInsensitiveDict(headers or {})
+        for header in ('Content-Encoding', 'Content-Length', 'Transfer-Encoding'):
+            response.headers.pop(header, None)
+        if content_type:
+            response.headers['Content-Type'] = content_type
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+http_client = HttpClient(cache=HttpCache(), politeness=default_politeness)
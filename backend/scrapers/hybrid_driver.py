@@ -0,0 +1,181 @@
+"""Hybrid fetching: the browser keeps the login, plain HTTP does the bulk reads.
+
+HybridDriver wraps an authenticated WebDriver. Its session cookies are copied
+into the shared pooled HttpClient, and `get` fetches the page over HTTP. The
+real browser is only used when the HTTP response is a login redirect or an
+error, or when the page turns out to need JavaScript, i.e. the site's content
+selector is not in the HTML (checked by browser.wait_until_ready).
+
+BatchFetchDriver is the variant for when cookies cannot be exported: it stays
+on one authenticated page and pulls many articles at once with fetch() calls
+run inside that page, then serves them the same way.
+"""
+import time
+import logging
+from urllib.parse import urlparse
+
+import requests
+
+from scrapers.browser import navigate
+from scrapers.html_parser import matches
+from scrapers.http_client import http_client
+from scrapers.politeness import politeness
+
+logger = logging.getLogger(__name__)
+
+# Path fragments of the pages the help centres bounce anonymous visitors to
+LOGIN_MARKERS = ('login', 'signin', 'sign_in', '/access/unauthenticated')
+
+FETCH_BATCH_JS = """
+var urls = arguments[0], concurrency = arguments[1];
+var done = arguments[arguments.length - 1];
+var results = {}, next = 0, active = 0;
+
+function launch() {
+    if (next >= urls.length && active === 0) return done(results);
+    while (active < concurrency && next < urls.length) {
+        (function (url) {
+            active++;
+            fetch(url, {credentials: 'same-origin'})
+                .then(function (r) {
+                    if (!r.ok || (r.redirected && /login|signin|sign_in|unauthenticated/i.test(r.url))) {
+                        return {status: r.status, html: null};
+                    }
+                    return r.text().then(function (html) { return {status: r.status, html: html}; });
+                })
+                .catch(function () { return {status: null, html: null}; })
+                .then(function (result) { results[url] = result; active--; launch(); });
+        })(urls[next++]);
+    }
+}
+launch();
+"""
+
+def fetch_in_browser(driver, urls, concurrency=6, timeout=60):
+    """Fetch urls from inside the current page.
+
+    Returns {url: {'status': HTTP status or None, 'html': body or None}}; the
+    body is None for errors and login redirects, the status for network errors.
+    """
+    driver.set_script_timeout(timeout)
+    return driver.execute_async_script(FETCH_BATCH_JS, urls, concurrency) or {}
+
+def export_cookies(driver):
+    """Return every cookie of the browser session, for all domains, as Selenium dicts."""
+    try:
+        # CDP sees cookies of every domain; get_cookies() only those of the current page
+        return driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+    except Exception as e:
+        logger.info(f"CDP cookie export unavailable ({e}); using the current page's cookies")
+        return driver.get_cookies()
+
+def is_login_redirect(response):
+    if response.status_code in (401, 403):
+        return True
+    final_path = urlparse(response.url).path.lower()
+    return bool(response.history) and any(marker in final_path for marker in LOGIN_MARKERS)
+
+class HybridDriver:
+    """WebDriver stand-in that serves pages over HTTP and falls back to the browser."""
+
+    hybrid = True
+
+    def __init__(self, driver, client=http_client):
+        self._driver = driver
+        self._client = client
+        self._cookies_loaded = False
+        self._url = None
+        self._html = None
+
+    @property
+    def over_http(self):
+        """True when the current page was fetched over HTTP rather than rendered."""
+        return self._html is not None
+
+    def get(self, url):
+        self._url = url
+        self._html = None
+        if not self._cookies_loaded:
+            self._client.set_cookies(export_cookies(self._driver))
+            self._cookies_loaded = True
+        try:
+            response = self._client.get(url)
+        except requests.RequestException as e:
+            logger.warning(f"HTTP fetch of {url} failed ({e}); using the browser")
+            return self.render()
+        if response.status_code != 200 or is_login_redirect(response):
+            logger.info(f"{url} needs the browser (HTTP {response.status_code} at {response.url})")
+            return self.render()
+        self._html = response.text
+
+    def has_content(self, selector):
+        return matches(self._html, selector)
+
+    def render(self):
+        """Load the current URL in the real browser."""
+        self._html = None
+        return navigate(self._driver, self._url)
+
+    @property
+    def page_source(self):
+        return self._html if self.over_http else self._driver.page_source
+
+    @property
+    def current_url(self):
+        return self._url if self.over_http else self._driver.current_url
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+class BatchFetchDriver(HybridDriver):
+    """HybridDriver that prefetches pages with in-browser fetch() instead of exported cookies.
+
+    The fetches share the origin and cookies of the page the browser is on, so
+    `prefetch` must be called while it sits on the same site (e.g. the
+    collection page the article links came from).
+    """
+
+    batch_size = 25
+
+    def __init__(self, driver):
+        super().__init__(driver)
+        self._pages = {}
+
+    def prefetch(self, urls):
+        urls = [url for url in urls if url not in self._pages]
+        records = getattr(self._driver, 'records', False)
+        fetched = 0
+        i = 0
+        while i < len(urls):
+            # As many pages as the host's limiter lets go right now, each on its own slot and token
+            limiter = politeness.limiter(urls[i])
+            count = limiter.acquire_batch(min(self.batch_size, len(urls) - i))
+            batch = urls[i:i + count]
+            i += count
+            started = time.monotonic()
+            try:
+                results = fetch_in_browser(self._driver, batch, count)
+            except Exception as e:
+                logger.warning(f"In-browser fetch of {len(batch)} pages failed: {e}")
+                for _ in batch:
+                    limiter.release()
+                continue
+            latency = time.monotonic() - started
+            for url in batch:
+                result = results.get(url) or {}
+                # A network error counts against the host like an HTTP 503, as in Politeness.call
+                limiter.release(result.get('status') or 503, latency)
+                html = result.get('html')
+                if html:
+                    self._pages[url] = html
+                    fetched += 1
+                    if records:
+                        # page_region serves these over HTTP, so the recording driver never sees them
+                        self._driver.record(url, html)
+        logger.info(f"Prefetched {fetched} of {len(urls)} pages in the browser")
+
+    def get(self, url):
+        self._url = url
+        self._html = self._pages.pop(url, None)
+        if self._html is None:
+            return self.render()
@@ -1,9 +1,14 @@
-import time
 import re
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import Tag, NavigableString
 from urllib.parse import urljoin, urlparse
 import logging
 
+from scrapers.browser import navigate, page_region, wait_until_ready
+from scrapers.frontier import run_tracked
+from scrapers.html_parser import parse
+from scrapers.markdown import BlockConverter
+from scrapers.markdown_writer import MarkdownWriter
+
 logger = logging.getLogger(__name__)
 
 def clean_text(text):
@@ -12,29 +17,21 @@ def clean_text(text):
     return re.sub(r'\s+', ' ', text).strip()
 
 class IsamsDeveloperScraper:
-    def __init__(self, driver):
+    def __init__(self, driver, changes=None):
         self.driver = driver
         self.seen_urls = set()
+        # Optional ManifestRun: skip re-converting articles whose content is unchanged
+        self.changes = changes
 
     def scrape_article(self, url):
         try:
-            self.driver.get(url)
+            navigate(self.driver, url)
             # Wait for content to appear (ReadMe.io specific)
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.support.ui import WebDriverWait
-            from selenium.webdriver.support import expected_conditions as EC
-            
-            # ReadMe pages sometimes take a while to render the .rm-Article content
-            try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, ".rm-Article"))
-                )
-                # Wait a bit more for internal elements like code blocks and callouts
-                time.sleep(2)
-            except:
-                logger.warning(f"Timeout waiting for .rm-Article on {url}")
+            # ReadMe pages render .rm-Article and then fill in code blocks and callouts,
+            # so wait until the container exists and the DOM has stopped changing
+            wait_until_ready(self.driver, 'isams_developer')
             
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            soup = parse(page_region(self.driver, 'isams_developer'), region='isams_developer')
             
             # Extract Breadcrumbs
             breadcrumbs = [a.get_text(strip=True) for a in soup.select(".rm-Breadcrumbs a")]
@@ -48,15 +45,23 @@ class IsamsDeveloperScraper:
             if not content_div:
                 content_div = soup.select_one("article") or soup.select_one("#content")
             
-            content_md = ""
-            if content_div:
-                content_md = self.process_element_to_markdown(content_div)
+            fallback_div = soup.select_one(".rm-Content") or soup.select_one(".markdown-body")
             
-            if not content_md.strip():
-                # Try a broader selector if specifically .rm-Article failed
-                content_div = soup.select_one(".rm-Content") or soup.select_one(".markdown-body")
+            def convert():
+                content_md = ""
                 if content_div:
                     content_md = self.process_element_to_markdown(content_div)
+                
+                if not content_md.strip():
+                    # Try a broader selector if specifically .rm-Article failed
+                    if fallback_div:
+                        content_md = self.process_element_to_markdown(fallback_div)
+                return content_md
+            
+            if self.changes is not None:
+                content_md = self.changes.convert(url, str(content_div or fallback_div or ""), convert)
+            else:
+                content_md = convert()
 
             return {
                 "title": title,
@@ -69,145 +74,13 @@ class IsamsDeveloperScraper:
             return None
 
     def process_element_to_markdown(self, element):
-        md = ""
-        # We want to be careful: finding all tags recursively might return 
-        # many parent containers (divs) that wrap the actual content.
-        # If we mark a parent div as 'seen', we skip all its children.
-        
-        # Strategy: 
-        # 1. Target semantic content tags directly.
-        # 2. Only target 'div' if it is a specialized block (Callout, CodeBlock).
-        
-        content_tags = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'pre', 'blockquote']
-        blocks = element.find_all(content_tags, recursive=True)
-        
-        # Also find specialized divs
-        special_divs = element.find_all('div', class_=lambda c: c and any(cls in c for cls in ['rm-Callout', 'callout', 'rm-CodeBlock', 'highlight']))
-        
-        # Combine and sort by position in document to preserve order
-        all_blocks = blocks + special_divs
-        
-        # Helper to get sort key (sourceline is best if available, otherwise index in children)
-        # Note: sourceline might not be present if the HTML was modified or depending on the BS4 parser used
-        def get_sort_key(el):
-            return el.sourceline or 0
-
-        # Since sourceline can be unreliable, we can use a custom index if needed
-        # But usually in ReadMe docs, they appear in order in find_all
-        # Let's use a simpler approach: iterate all children of .rm-Article recursively 
-        # but only process the ones that match our criteria and aren't inside already processed ones.
-        
-        seen_elements = set()
-        
-        # Re-fetch all potential blocks to ensure we have them in DOM order
-        # We include tags that we want to extract content from
-        potential_blocks = element.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'pre', 'blockquote', 'div'], recursive=True)
-        
-        i = 0
-        while i < len(potential_blocks):
-            block = potential_blocks[i]
-            if block in seen_elements:
-                i += 1
-                continue
-            
-            classes = block.get('class', [])
-            # Skip noise
-            if any(c in classes for c in ['rm-Article-meta', 'rm-Sidebar', 'rm-Callout-icon', 'rm-Article-navigation', 'rm-Breadcrumbs']):
-                i += 1
-                continue
-
-            # Check if it's a specialized DIV
-            is_special_div = block.name == 'div' and any(c in classes for c in ['rm-Callout', 'callout', 'rm-CodeBlock', 'rm-CodeTabs', 'highlight'])
-            
-            # If it's a generic div and not a content tag, skip it BUT DON'T MARK CHILDREN AS SEEN
-            if block.name == 'div' and not is_special_div:
-                i += 1
-                continue
-            
-            text = block.get_text().strip()
-            
-            # Special Handling for Callouts
-            if is_special_div and any(c in classes for c in ['rm-Callout', 'callout']):
-                title_el = block.select_one('.rm-Callout-title') or block.select_one('.callout-heading')
-                body_el = block.select_one('.rm-Callout-body') or block.select_one('.callout-body')
-                title = title_el.get_text(strip=True) if title_el else "Note"
-                body = body_el.get_text(strip=True) if body_el else block.get_text().replace(title, '').strip()
-                md += f"> **{title}**\n> {body}\n\n"
-                
-                self.mark_seen_recursive(block, seen_elements)
-                i += 1
-                continue
-
-            # Special Handling for Prompt/Output
-            if block.name in ['p', 'div', 'strong', 'em', 'span'] and re.match(r'^(Prompt|Output):?$', text, re.IGNORECASE):
-                label_type = text.replace(':', '').capitalize()
-                code_block = self.find_next_code_block(i, potential_blocks)
-                
-                if code_block:
-                    code_el = code_block.find('code')
-                    code_text = code_el.get_text().strip() if code_el else code_block.get_text().strip()
-                    if '\n' not in code_text and len(code_text) < 150:
-                        md += f"**{label_type}**: `{code_text}`\n\n"
-                    else:
-                        md += f"**{label_type}**:\n```\n{code_text}\n```\n\n"
-                    
-                    seen_elements.add(block)
-                    self.mark_seen_recursive(code_block, seen_elements)
-                    i += 1
-                    continue
-
-            # Process standard content tags
-            if block.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'pre', 'blockquote'] or \
-               (block.name == 'div' and 'rm-CodeBlock' in classes):
-                
-                tag = block.name
-                if not text and tag != 'pre':
-                    i += 1
-                    continue
-
-                if tag.startswith('h'):
-                    level = int(tag[1])
-                    md += f"{'#' * level} {text}\n\n"
-                elif tag == 'p':
-                    md += f"{text}\n\n"
-                elif tag == 'ul':
-                    for li in block.find_all('li', recursive=False):
-                        md += f"- {li.get_text(strip=True)}\n"
-                    md += "\n"
-                elif tag == 'ol':
-                    for k, li in enumerate(block.find_all('li', recursive=False)):
-                        md += f"{k+1}. {li.get_text(strip=True)}\n"
-                    md += "\n"
-                elif tag == 'pre' or 'rm-CodeBlock' in classes or 'highlight' in classes:
-                    code_el = block.find('code')
-                    code_text = code_el.get_text().strip() if code_el else block.get_text().strip()
-                    md += f"```\n{code_text}\n```\n\n"
-                elif tag == 'blockquote':
-                    md += f"> {text}\n\n"
-                
-                self.mark_seen_recursive(block, seen_elements)
-
-            i += 1
-        return md
-
-    def mark_seen_recursive(self, element, seen_set):
-        seen_set.add(element)
-        for child in element.find_all(True):
-            seen_set.add(child)
-
-    def find_next_code_block(self, current_index, blocks):
-        for j in range(current_index + 1, min(current_index + 10, len(blocks))):
-            b = blocks[j]
-            classes = b.get('class', [])
-            if b.name == 'pre' or any(c in classes for c in ['rm-CodeBlock', 'highlight']):
-                return b
-        return None
+        return IsamsMarkdown(element).convert()
 
     def discover_links(self, base_url):
         links = []
         try:
             # The sidebar links have class .rm-Sidebar-link
-            sidebar = BeautifulSoup(self.driver.page_source, 'html.parser').select_one('#hub-sidebar')
+            sidebar = parse(page_region(self.driver, 'isams_developer_sidebar'), region='isams_developer_sidebar').select_one('#hub-sidebar')
             if sidebar:
                 for a in sidebar.find_all('a', href=True, class_='rm-Sidebar-link'):
                     href = a['href']
@@ -220,36 +93,130 @@ class IsamsDeveloperScraper:
             logger.error(f"Error discovering links: {e}")
         return links
 
-def scrape_isams_developer(url, driver):
-    scraper = IsamsDeveloperScraper(driver)
+class IsamsMarkdown(BlockConverter):
+    """ReadMe article body to Markdown.
+
+    Generic divs are only wrappers: they are skipped without hiding their
+    children. Callouts become quotes and a "Prompt:"/"Output:" label is
+    joined with the code block after it.
+    """
+
+    def convert_block(self, i):
+        block = self.blocks[i]
+        classes = block.get('class', [])
+        # Skip noise
+        if any(c in classes for c in ['rm-Article-meta', 'rm-Sidebar', 'rm-Callout-icon', 'rm-Article-navigation', 'rm-Breadcrumbs']):
+            return i + 1
+
+        is_special_div = block.name == 'div' and any(c in classes for c in ['rm-Callout', 'callout', 'rm-CodeBlock', 'rm-CodeTabs', 'highlight'])
+        if block.name == 'div' and not is_special_div:
+            return i + 1
+
+        if is_special_div and any(c in classes for c in ['rm-Callout', 'callout']):
+            title_el = block.select_one('.rm-Callout-title') or block.select_one('.callout-heading')
+            body_el = block.select_one('.rm-Callout-body') or block.select_one('.callout-body')
+            title = self.dom.stripped_text(title_el) if title_el else "Note"
+            body = self.dom.stripped_text(body_el) if body_el else self.dom.text(block).replace(title, '').strip()
+            self.emit(f"> **{title}**\n> {body}\n\n")
+            self.mark_seen(i)
+            return i + 1
+
+        label = self.dom.short_text(block, len('Prompt:')) if block.name in ['p', 'div'] else None
+        if label and re.match(r'^(Prompt|Output):?$', label, re.IGNORECASE):
+            j = self.find_next_code_block(i)
+            if j is not None:
+                self.labelled_code(label.replace(':', '').capitalize(), self.code_text(self.blocks[j]))
+                self.mark_one(i)
+                self.mark_seen(j)
+                return i + 1
+
+        if block.name == 'div' and 'rm-CodeBlock' not in classes:
+            return i + 1
+        tag = block.name
+        if not self.dom.has_text(block) and tag != 'pre':
+            return i + 1
+
+        if tag.startswith('h'):
+            self.emit(f"{'#' * int(tag[1])} {self.dom.text(block).strip()}\n\n")
+        elif tag == 'p':
+            self.emit(f"{self.dom.text(block).strip()}\n\n")
+        elif tag == 'ul':
+            for li in block.find_all('li', recursive=False):
+                self.emit(f"- {self.dom.stripped_text(li)}\n")
+            self.emit("\n")
+        elif tag == 'ol':
+            for k, li in enumerate(block.find_all('li', recursive=False)):
+                self.emit(f"{k+1}. {self.dom.stripped_text(li)}\n")
+            self.emit("\n")
+        elif tag == 'pre' or 'rm-CodeBlock' in classes or 'highlight' in classes:
+            self.fenced(self.code_text(block))
+        elif tag == 'blockquote':
+            self.emit(f"> {self.dom.text(block).strip()}\n\n")
+        self.mark_seen(i)
+        return i + 1
+
+    def code_text(self, code_block):
+        code_el = code_block.find('code')
+        return self.dom.text(code_el or code_block).strip()
+
+    def find_next_code_block(self, i):
+        for j in range(i + 1, min(i + 10, len(self.blocks))):
+            b = self.blocks[j]
+            classes = b.get('class', [])
+            if b.name == 'pre' or any(c in classes for c in ['rm-CodeBlock', 'highlight']):
+                return j
+        return None
+
+def scrape_isams_developer(url, driver, changes=None, frontier=None, pool=None, writer=None):
+    writer = writer or MarkdownWriter()
+    scraper = IsamsDeveloperScraper(driver, changes)
+
+    def emit(article):
+        # Only re-emit what changed since the last run
+        if changes is None or changes.is_delta(article['url']):
+            writer.write_article(article, format_isams_developer_article(article))
     
     # Scrape main article
     main_article = scraper.scrape_article(url)
     if not main_article:
-        return "Failed to scrape main article."
+        if changes is not None:
+            # Nothing under it was reached either
+            changes.mark_incomplete()
+        writer.write("Failed to scrape main article.")
+        return writer.getvalue()
+    emit(main_article)
     
     # Discover and scrape sub-articles
     sub_links = scraper.discover_links(url)
-    all_articles = [main_article]
     
     # We want to be careful not to scrape the whole site if it's too big
     # But for a specific section like /docs/batch-api, it should be manageable
     # We'll filter links to make sure they are sub-paths if possible
     base_path = urlparse(url).path
-    for sub_url in sub_links:
-        if urlparse(sub_url).path.startswith(base_path) and sub_url != url:
-            article = scraper.scrape_article(sub_url)
-            if article:
-                all_articles.append(article)
+    sub_links = [sub_url for sub_url in sub_links if urlparse(sub_url).path.startswith(base_path) and sub_url != url]
+    if frontier is not None:
+        frontier.add_all(sub_links)
+    
+    def scrape_sub_article(sub_driver, sub_url):
+        sub_scraper = scraper if sub_driver is driver else IsamsDeveloperScraper(sub_driver, changes)
+        return run_tracked(frontier, sub_url, lambda: sub_scraper.scrape_article(sub_url), changes=changes)
     
+    if pool is not None:
+        results = pool.map(scrape_sub_article, sub_links)
+    else:
+        results = (scrape_sub_article(driver, sub_url) for sub_url in sub_links)
+    for article in results:
+        if article:
+            emit(article)
+    return writer.getvalue()
+
+def format_isams_developer_markdown(articles):
     # Format into single Markdown
-    final_md = ""
-    for art in all_articles:
-        final_md += f"# {art['title']}\n"
-        final_md += f"**Link**: {art['url']}\n"
-        if art['breadcrumbs']:
-            final_md += f"**Path**: {' > '.join(art['breadcrumbs'])}\n"
-        final_md += f"\n{art['content']}\n"
-        final_md += "---\n\n"
-        
-    return final_md
+    return "".join(format_isams_developer_article(art) for art in articles)
+
+def format_isams_developer_article(art):
+    lines = [f"# {art['title']}\n", f"**Link**: {art['url']}\n"]
+    if art['breadcrumbs']:
+        lines.append(f"**Path**: {' > '.join(art['breadcrumbs'])}\n")
+    lines += [f"\n{art['content']}\n", "---\n\n"]
+    return "".join(lines)
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from scrapers.http_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_PATH = os.path.join(CACHE_DIR, 'manifest.sqlite3')
+
+class Manifest:
+    """Persistent per-URL record of the last extracted content hash and its Markdown.
+
+    Entries are grouped by scope (normally the URL the scrape was started from)
+    so removed articles can be detected per crawl.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " scope TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " markdown TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (scope, url))"
+        )
+        self._conn.commit()
+
+    def start_run(self, scope):
+        return ManifestRun(self, scope)
+
+def content_hash(region_html):
+    return hashlib.sha256(region_html.encode('utf-8')).hexdigest()
+
+class ManifestRun:
+    """Change tracking for one scrape of a scope.
+
+    Scrapers hand every article's extracted content region to `convert`, which
+    only runs the (expensive) Markdown conversion when the region's hash differs
+    from the stored one. New hashes are only staged; `finish` writes them
+    together with the removals once the run has delivered its deltas, so a run
+    that dies half way re-emits its changes next time.
+
+    Removals are only recorded when the crawl was complete (see
+    mark_incomplete), and never for URLs that failed (mark_failed).
+    """
+
+    def __init__(self, manifest, scope):
+        self.manifest = manifest
+        self.scope = scope
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.removed = []
+        self.failed = set()
+        self.complete = True
+        self._deltas = set()
+        self._staged = {}           # url -> (content_hash, markdown), written by finish()
+        self._lock = threading.Lock()
+
+    def stored(self, url):
+        """(content_hash, markdown) from the last finished run, or None."""
+        manifest = self.manifest
+        with manifest._lock:
+            return manifest._conn.execute(
+                "SELECT content_hash, markdown FROM articles WHERE scope = ? AND url = ?",
+                (self.scope, url)
+            ).fetchone()
+
+    def convert(self, url, region_html, convert):
+        return self.convert_hashed(url, content_hash(region_html), convert)
+
+    def convert_hashed(self, url, region_hash, convert):
+        """convert() for a region that has already been hashed (e.g. in a worker process)."""
+        row = self.stored(url)
+        if row and row[0] == region_hash:
+            with self._lock:
+                self.unchanged.append(url)
+            return row[1]
+
+        markdown = convert()
+        self._record(url, row, region_hash, markdown)
+        return markdown
+
+    def keep(self, url, markdown=None):
+        """Count url as seen without converting it: a resumed run served it from its frontier.
+
+        Its Markdown is compared with the stored one, since the interrupted run
+        that produced it never got to finish().
+        """
+        row = self.stored(url)
+        if markdown is None or (row and row[1] == markdown):
+            with self._lock:
+                self.unchanged.append(url)
+            return
+        # No region hash for it: the next run converts it again and finds it unchanged
+        self._record(url, row, '', markdown)
+
+    def _record(self, url, row, region_hash, markdown):
+        with self._lock:
+            self._staged[url] = (region_hash, markdown)
+            if row and row[1] == markdown:
+                # The region changed but not its Markdown (e.g. only markup around it)
+                self.unchanged.append(url)
+                return
+            (self.changed if row else self.added).append(url)
+            self._deltas.add(url)
+
+    def mark_failed(self, url):
+        """url could not be scraped this run: keep its stored entry."""
+        with self._lock:
+            self.failed.add(url)
+
+    def mark_incomplete(self):
+        """The crawl did not reach every article (page limit, or a listing failed to load)."""
+        self.complete = False
+
+    def is_delta(self, url):
+        """True if url was added or changed during this run."""
+        with self._lock:
+            return url in self._deltas
+
+    def finish(self):
+        """Store this run's hashes, drop the articles it found gone and return the summary."""
+        seen = set(self.added) | set(self.changed) | set(self.unchanged)
+        now = time.time()
+        manifest = self.manifest
+        with manifest._lock:
+            manifest._conn.executemany(
+                "INSERT OR REPLACE INTO articles (scope, url, content_hash, markdown, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(self.scope, url, region_hash, markdown, now) for url, (region_hash, markdown) in self._staged.items()]
+            )
+            stored = [row[0] for row in manifest._conn.execute(
+                "SELECT url FROM articles WHERE scope = ?", (self.scope,)
+            )]
+            if self.complete:
+                self.removed = [url for url in stored if url not in seen and url not in self.failed]
+            manifest._conn.executemany(
+                "DELETE FROM articles WHERE scope = ? AND url = ?",
+                [(self.scope, url) for url in self.removed]
+            )
+            manifest._conn.commit()
+        logger.info(f"Manifest {self.scope}: {len(self.added)} added, {len(self.changed)} changed, "
+                    f"{len(self.removed)} removed, {len(self.unchanged)} unchanged, {len(self.failed)} failed"
+                    + ("" if self.complete else " (incomplete crawl, nothing removed)"))
+        return self.summary()
+
+    def summary(self):
+        return {
+            "added": list(self.added),
+            "changed": list(self.changed),
+            "removed": list(self.removed),
+            "unchanged": len(self.unchanged),
+            "failed": sorted(self.failed),
+        }
+
+manifest = Manifest()
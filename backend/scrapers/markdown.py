@@ -0,0 +1,176 @@
+"""Single-pass DOM-to-Markdown conversion shared by the block-based scrapers.
+
+The Toddle, iSAMS Developer and Prompting Guide converters all walk the same
+way: list every block element under the content root in document order, skip
+blocks inside one already emitted, and turn the rest into Markdown by tag and
+class. BlockConverter does the walking once for all of them. Each site
+subclasses it with its own rules in `convert_block`: Intercom notes, ReadMe
+callouts, Prompt/Output pairs.
+
+The tree is indexed in one traversal (DomIndex). Every tag's text is then a
+slice of a single string instead of a fresh get_text() walk, and "skip what is
+inside an emitted block" costs O(1) per block instead of a find_all(True) per
+emitted block.
+"""
+import re
+
+from bs4 import CData, NavigableString, Tag
+
+# The string types Tag.get_text() returns for ordinary tags (not comments, scripts or styles)
+TEXT_TYPES = (NavigableString, CData)
+
+_NON_SPACE = re.compile(r'\S')
+
+class DomIndex:
+    """Document-order index of everything under root, built in one walk.
+
+    `blocks` is what root.find_all(names) returns. The descendants of
+    blocks[i] that are blocks themselves are blocks[i + 1:block_end[i]].
+    """
+
+    def __init__(self, root, names, ancestor_names=()):
+        names = set(names)
+        ancestor_names = set(ancestor_names)
+        self.blocks = []
+        self.block_end = []
+        self.inside = []            # per block: has an ancestor named in ancestor_names
+        self.strings = []
+        self._offsets = [0]         # character offset of each string in self.text_all
+        self._span = {}             # id(tag) -> (first string, end string)
+        self._shape = {}            # id(tag) -> hash of name, attributes and contents
+        open_ancestors = sum(1 for parent in root.parents if parent.name in ancestor_names)
+
+        stack = [(root, None)]
+        while stack:
+            node, block = stack.pop()
+            if block is not None:
+                # Leaving node: all of its descendants have been indexed
+                self._span[id(node)] = (self._span[id(node)], len(self.strings))
+                self._shape[id(node)] = hash((node.name, _attrs_key(node.attrs), tuple(
+                    self._shape[id(child)] if isinstance(child, Tag) else hash(child)
+                    for child in node.contents)))
+                if block >= 0:
+                    self.block_end[block] = len(self.blocks)
+                if node.name in ancestor_names:
+                    open_ancestors -= 1
+                continue
+            if not isinstance(node, Tag):
+                if type(node) in TEXT_TYPES:
+                    self.strings.append(node)
+                    self._offsets.append(self._offsets[-1] + len(node))
+                continue
+
+            block = -1
+            if node is not root and node.name in names:
+                block = len(self.blocks)
+                self.blocks.append(node)
+                self.block_end.append(None)
+                self.inside.append(open_ancestors > 0)
+            if node.name in ancestor_names:
+                open_ancestors += 1
+            self._span[id(node)] = len(self.strings)
+            stack.append((node, block))
+            stack.extend((child, None) for child in reversed(node.contents))
+
+        self.text_all = ''.join(self.strings)
+
+    def text(self, tag):
+        """tag.get_text()"""
+        first, end = self._span[id(tag)]
+        return self.text_all[self._offsets[first]:self._offsets[end]]
+
+    def stripped_text(self, tag):
+        """tag.get_text(strip=True)"""
+        first, end = self._span[id(tag)]
+        return ''.join(s for s in (string.strip() for string in self.strings[first:end]) if s)
+
+    def has_text(self, tag):
+        """True if tag's text is not just whitespace."""
+        first, end = self._span[id(tag)]
+        return _NON_SPACE.search(self.text_all, self._offsets[first], self._offsets[end]) is not None
+
+    def short_text(self, tag, limit):
+        """tag.get_text().strip() if that is at most limit characters long, else None."""
+        first, end = self._span[id(tag)]
+        start, stop = self._offsets[first], self._offsets[end]
+        match = _NON_SPACE.search(self.text_all, start, stop)
+        if match is None:
+            return ''
+        if _NON_SPACE.search(self.text_all, match.start() + limit, stop):
+            return None
+        return self.text_all[start:stop].strip()
+
+    def shape(self, tag):
+        """Hash that is equal for tags that compare equal (same name, attributes and contents)."""
+        return self._shape[id(tag)]
+
+def _attrs_key(attrs):
+    return tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                        for name, value in attrs.items()))
+
+class BlockConverter:
+    """Walks the blocks under a root once and collects Markdown from convert_block.
+
+    Subclasses set `block_names` and implement `convert_block(i)`, which
+    appends Markdown for self.blocks[i] and returns the index to continue from.
+    Blocks inside an emitted block are skipped without being visited again.
+    """
+
+    block_names = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'pre', 'blockquote', 'div']
+    ancestor_names = ()
+
+    def __init__(self, root):
+        self.dom = DomIndex(root, self.block_names, self.ancestor_names)
+        self.blocks = self.dom.blocks
+        self.md = []
+        # Emitted tags by shape. Like the set of Tags the converters used to
+        # keep, a block also counts as seen when it is equal to one already
+        # emitted (bs4 Tags compare by content), e.g. a repeated snippet.
+        self._seen = {}
+        self._registered = bytearray(len(self.blocks))
+
+    def convert(self):
+        i = 0
+        while i < len(self.blocks):
+            if self.is_seen(i):
+                i += 1
+                continue
+            i = self.convert_block(i)
+        return ''.join(self.md)
+
+    def convert_block(self, i):
+        raise NotImplementedError
+
+    def emit(self, markdown):
+        self.md.append(markdown)
+
+    def is_seen(self, i):
+        block = self.blocks[i]
+        for other in self._seen.get(self.dom.shape(block), ()):
+            if other is block or other == block:
+                return True
+        return False
+
+    def mark_seen(self, i):
+        """Mark blocks[i] and every block inside it as emitted."""
+        for j in range(i, self.dom.block_end[i]):
+            self.mark_one(j)
+
+    def mark_one(self, i):
+        if self._registered[i]:
+            return
+        self._registered[i] = 1
+        block = self.blocks[i]
+        self._seen.setdefault(self.dom.shape(block), []).append(block)
+
+    # Markdown shared by the site rules
+
+    def labelled_code(self, label, code_text, lang=''):
+        """`**Label**: `code`` for one-liners, a fenced block otherwise."""
+        if '\n' not in code_text and len(code_text) < 150:
+            self.emit(f"**{label}**: `{code_text}`\n\n")
+        else:
+            self.emit(f"**{label}**:\n```{lang}\n{code_text}\n```\n\n")
+
+    def fenced(self, code_text, lang=''):
+        self.emit(f"```{lang}\n{code_text}\n```\n\n")
@@ -0,0 +1,41 @@
+"""Incremental output for the scrapers' Markdown exports.
+
+The scrapers used to build their whole export with `+=` on one string and
+hand it back when the crawl finished. Now they pass each finished article's
+Markdown block to a MarkdownWriter, which forwards it to a sink right away.
+The sink can be a file, a socket's makefile(), or any object with write().
+Without a sink the writer buffers in memory, and getvalue() returns exactly
+the text the old formatters produced.
+"""
+import io
+
+class MarkdownWriter:
+    def __init__(self, sink=None):
+        self._buffer = io.StringIO() if sink is None else None
+        self.sink = sink if sink is not None else self._buffer
+        self.articles = 0
+
+    def write(self, markdown):
+        """Write text that is not an article of its own (export headers, notices)."""
+        self.sink.write(markdown)
+
+    def write_article(self, article, markdown):
+        """Write one finished article's Markdown block and push it to the sink.
+
+        article is the scraper's record for it (dict or Article); subclasses
+        that stream structured results use it.
+        """
+        self.articles += 1
+        self.write(markdown)
+        flush = getattr(self.sink, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def scraped(self, article):
+        """An article is finished but its Markdown has to wait (the Toddle export's
+        header carries the article count). Writers that stream records send it now;
+        write_article still follows for it later."""
+
+    def getvalue(self):
+        """Everything written so far when buffering in memory; '' when writing to a sink."""
+        return self._buffer.getvalue() if self._buffer is not None else ""
@@ -1,18 +1,39 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
+import json
+import heapq
+import zlib
+from concurrent.futures import wait, FIRST_COMPLETED
+from functools import partial
+from scrapers.http_client import http_client
+from scrapers.frontier import DONE, FAILED, QUEUED
+from scrapers.html_parser import parse
+from scrapers.markdown_writer import MarkdownWriter
+from scrapers.pipeline import Pipeline, then
 
 def clean_text(text):
     if not text:
         return ""
     return re.sub(r'\s+', ' ', text).strip()
 
-def scrape_odoo_article(url):
+def _fetch_page(url):
+    """Download url, or report the error and return None."""
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        return response.content
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
+
+def scrape_odoo_article(url, changes=None):
+    page = _fetch_page(url)
+    return odoo_article_from_page(url, page, changes) if page is not None else None
+
+def odoo_article_from_page(url, page, changes=None):
+    """Parse and convert a downloaded article page (runs in pipeline worker processes)."""
+    try:
+        soup = parse(page, region='odoo_article')
 
         # Extract Hierarchy from URL
         # Example: https://www.odoo.com/documentation/18.0/applications/sales/crm/acquire_leads/convert.html
@@ -54,14 +75,14 @@ def scrape_odoo_article(url):
             # Use main_content as root. We will handle wrapper divs recursively in process_element.
             content_root = main_content
 
-            def process_element(element, depth=2):
-                md_out = ""
+            def process_element(element, md_out, depth=2):
+                """Append element's Markdown to the md_out list."""
                 if not element.name:
-                    return ""
+                    return
                     
                 # Ignore git link
                 if element.name == 'a' and 'o_git_link' in element.get('class', []):
-                    return ""
+                    return
 
                 # Helper to check for alert classes
                 classes = element.get('class', [])
@@ -71,8 +92,8 @@ def scrape_odoo_article(url):
                 # If it's a div and NOT an alert, treat it as a wrapper and recurse
                 if element.name == 'div' and not is_alert:
                     for child in element.children:
-                        md_out += process_element(child, depth)
-                    return md_out
+                        process_element(child, md_out, depth)
+                    return
 
                 if element.name == 'section':
                     # Check for title
@@ -80,29 +101,29 @@ def scrape_odoo_article(url):
                     if h_tag:
                         title = clean_text(h_tag.get_text()).replace('¶', '')
                         hashes = "#" * depth
-                        md_out += f"{hashes} {title}\n\n"
+                        md_out.append(f"{hashes} {title}\n\n")
                     
                     # Process children of section
                     for child in element.children:
                         # Skip the header we just processed
                         if child == h_tag:
                             continue
-                        md_out += process_element(child, depth + 1)
+                        process_element(child, md_out, depth + 1)
                         
                 elif element.name == 'p':
                     text = clean_text(element.get_text())
                     if text:
-                        md_out += f"{text}\n\n"
+                        md_out.append(f"{text}\n\n")
                         
                 elif element.name == 'ul':
                     for li in element.find_all('li', recursive=False):
-                        md_out += f"- {clean_text(li.get_text())}\n"
-                    md_out += "\n"
+                        md_out.append(f"- {clean_text(li.get_text())}\n")
+                    md_out.append("\n")
                     
                 elif element.name == 'ol':
                      for i, li in enumerate(element.find_all('li', recursive=False)):
-                        md_out += f"{i+1}. {clean_text(li.get_text())}\n"
-                     md_out += "\n"
+                        md_out.append(f"{i+1}. {clean_text(li.get_text())}\n")
+                     md_out.append("\n")
                     
                 elif element.name == 'div' and is_alert:
                      alert_type = "NOTE"
@@ -111,19 +132,25 @@ def scrape_odoo_article(url):
                      elif 'alert-info' in classes: alert_type = "NOTE"
                      elif 'alert-success' in classes: alert_type = "TIP"
                      
-                     md_out += f"> [!{alert_type}]\n> {clean_text(element.get_text())}\n\n"
+                     md_out.append(f"> [!{alert_type}]\n> {clean_text(element.get_text())}\n\n")
                 
                 # Fallback for standalone headers not inside section (rare but possible)
                 elif element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
                      title = clean_text(element.get_text()).replace('¶', '')
                      hashes = "#" * depth
-                     md_out += f"{hashes} {title}\n\n"
+                     md_out.append(f"{hashes} {title}\n\n")
 
-                return md_out
+            def convert():
+                md = []
+                # Iterate over all children of content_root
+                for child in content_root.children:
+                    process_element(child, md)
+                return "".join(md)
 
-            # Iterate over all children of content_root
-            for child in content_root.children:
-                content_md += process_element(child)
+            if changes is not None:
+                content_md = changes.convert(url, str(content_root), convert)
+            else:
+                content_md = convert()
                          
         return {
             "url": url,
@@ -136,28 +163,28 @@ def scrape_odoo_article(url):
         print(f"Error scraping {url}: {e}")
         return None
 
-def _scrape_recursive(url, visited=None):
-    if visited is None:
-        visited = set()
-    
-    if url in visited:
-        return []
-    visited.add(url)
-    
-    articles_data = []
-    
+def _is_category_index(url, category_urls):
+    """True for a page that only introduces a category rather than an article of its own.
+
+    That is a directory's index.html, or X.html next to a category X/ (how
+    Sphinx lays out toctree pages). Both discovery modes leave these out.
+    """
+    if url.endswith('/index.html'):
+        return True
+    return url.endswith('.html') and url[:-len('.html')] + '/' in category_urls
+
+def _fetch_node(url, changes=None):
+    """Fetch a single crawl node and return (article_data, child_urls)."""
     # Check if it's a direct article (ends with .html)
     if url.endswith('.html'):
-        data = scrape_odoo_article(url)
-        if data:
-            articles_data.append(data)
-        return articles_data
+        return scrape_odoo_article(url, changes), []
 
     # Otherwise, treat as directory/category
+    child_urls = []
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = parse(response.content)
         
         # Check for directory listing (Index of ...)
         if soup.title and "Index of" in soup.title.string:
@@ -170,8 +197,7 @@ def _scrape_recursive(url, visited=None):
                 full_url = urljoin(url, href)
                 
                 if full_url.startswith(url): # Ensure we stay within the sub-path
-                     # Recurse
-                     articles_data.extend(_scrape_recursive(full_url, visited))
+                     child_urls.append(full_url)
         
         else:
             # Standard Odoo Category Page (might list articles or sub-categories)
@@ -188,43 +214,311 @@ def _scrape_recursive(url, visited=None):
                     
                     # Strict check: child of current URL
                     if full_url.startswith(url) and full_url != url:
-                         articles_data.extend(_scrape_recursive(full_url, visited))
+                         child_urls.append(full_url)
                          
     except Exception as e:
         print(f"Error scraping {url}: {e}")
-        
-    return articles_data
+        return None, None
+
+    categories = set(child_urls)
+    return None, [child for child in child_urls if not _is_category_index(child, categories)]
+
+def _crawl(root_url, max_workers=8, max_depth=None, max_pages=None, executor=None, changes=None, frontier=None, max_in_flight=None):
+    """Crawl the URL tree under root_url with a bounded pool of fetch workers.
+
+    Pages are fetched from a shared frontier as soon as they are discovered,
+    but the articles follow the same depth-first, first-visit order the old
+    recursive crawl produced. They are yielded as soon as every page before
+    them in that order is settled, so output starts while the crawl runs.
+    By default article pages go through a Pipeline, so their parsing and
+    conversion run in worker processes. An explicit executor (e.g. a process
+    pool for archive replay) instead runs whole fetches. With a CrawlFrontier
+    every fetched node is checkpointed, and a resumed crawl only fetches what
+    is still queued. As in Pipeline.map, at most max_in_flight pages are
+    fetched or waiting to be written at once; discovered pages queue up
+    until there is room.
+    """
+    max_in_flight = max_in_flight or 4 * max_workers
+    children = {}
+    articles = {}
+    depth = {root_url: 0}
+
+    to_fetch = [root_url]
+    if frontier is not None:
+        frontier.add(root_url, {'depth': 0})
+        to_fetch = []
+        for url, state, meta, record in frontier.entries():
+            # Entries queued by Sphinx discovery (same job key) carry no depth
+            depth[url] = (meta or {}).get('depth', 0)
+            if state == DONE:
+                articles[url] = record['article']
+                children[url] = record['children']
+                if changes is not None and record['article']:
+                    changes.keep(url, record['article']['content'])
+            elif state == FAILED:
+                if changes is not None:
+                    changes.mark_failed(url)
+                    if not url.endswith('.html'):
+                        # The pages under a failed category were never discovered
+                        changes.mark_incomplete()
+            elif state == QUEUED:
+                to_fetch.append(url)
+
+    pipeline = Pipeline(fetch_workers=max_workers) if executor is None else None
+    pool = executor or pipeline.fetch_pool
+    pending = {}
+    positions = {}
+    # Discovered, not yet submitted, as a heap keyed by each page's path of
+    # link positions from the root, i.e. the depth-first order the walk below
+    # writes the articles in
+    backlog = [((i,), url) for i, url in enumerate(to_fetch)]
+
+    def fill():
+        # Articles waiting for the walk count towards the limit too. The page the
+        # walk needs next is the first in the backlog, so it is never held back
+        # for long; with nothing pending it is submitted regardless.
+        while backlog and (not pending or len(pending) + len(articles) < max_in_flight):
+            position, url = heapq.heappop(backlog)
+            positions[url] = position
+            submit(url)
+
+    def submit(url):
+        if frontier is not None:
+            frontier.start(url)
+        if pipeline is not None and url.endswith('.html'):
+            article = pipeline.submit(_fetch_page, odoo_article_from_page, url, changes)
+            pending[then(article, lambda article: (article, []))] = url
+        else:
+            pending[pool.submit(_fetch_node, url, changes)] = url
+
+    # Walk the link graph depth-first to keep the original output order. The
+    # walk stops at the first page that is not fetched yet: while fetches are
+    # pending it may still be, or still be discovered by a later page.
+    visited = set()
+    stack = [root_url]
+
+    def settled():
+        while stack:
+            url = stack[-1]
+            if url in visited:
+                stack.pop()
+                continue
+            if url not in children and (pending or backlog):
+                return
+            stack.pop()
+            visited.add(url)
+            article = articles.pop(url, None)
+            if article:
+                yield article
+            stack.extend(reversed(children.get(url, [])))
+
+    try:
+        fill()
+        yield from settled()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                article, child_urls = future.result()
+                failed = child_urls is None or (url.endswith('.html') and article is None)
+                if failed and frontier is not None:
+                    frontier.fail(url, "fetch failed")
+                if changes is not None:
+                    if child_urls is None:
+                        changes.mark_failed(url)
+                        changes.mark_incomplete()
+                    elif failed:
+                        changes.mark_failed(url)
+                child_urls = child_urls or []
+                articles[url] = article
 
-def scrape_odoo(url):
+                new_children = []
+                if max_depth is not None and depth[url] >= max_depth:
+                    if child_urls and changes is not None:
+                        changes.mark_incomplete()
+                else:
+                    for child in child_urls:
+                        if child in depth:
+                            continue
+                        if max_pages is not None and len(depth) >= max_pages:
+                            if changes is not None:
+                                changes.mark_incomplete()
+                            break
+                        depth[child] = depth[url] + 1
+                        new_children.append(child)
+                # Children cut off by max_depth / max_pages are never fetched: leave
+                # them out of the graph so the walk does not wait for them
+                children[url] = [child for child in child_urls if child in depth]
+                if frontier is not None:
+                    if new_children:
+                        # Queue the children before the parent is done, so a crash in between
+                        # cannot leave a done page whose subtree a resume never fetches
+                        frontier.add_all(new_children, {'depth': depth[url] + 1})
+                    if not failed:
+                        frontier.complete(url, {'article': article, 'children': children[url]})
+                for i, child in enumerate(new_children):
+                    heapq.heappush(backlog, (positions[url] + (i,), child))
+            yield from settled()
+            fill()
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+
+def _sphinx_root(url):
+    """Return the root of the Sphinx build that url belongs to (where searchindex.js lives)."""
+    # Odoo docs: https://www.odoo.com/documentation/18.0/...
+    match = re.match(r'^(.*?/documentation/[^/]+/)', url)
+    if match:
+        return match.group(1)
+
+    # Otherwise ask the page itself: Sphinx stamps the relative root into every page
+    response = http_client.get(url)
+    response.raise_for_status()
+    soup = parse(response.content)
+    if soup.html and soup.html.get('data-content_root'):
+        return urljoin(url, soup.html['data-content_root'])
+    options = soup.find('script', id='documentation_options')
+    if options and options.get('data-url_root'):
+        return urljoin(url, options['data-url_root'])
+    return None
+
+def _docnames_from_searchindex(root):
+    response = http_client.get(urljoin(root, 'searchindex.js'))
+    response.raise_for_status()
+    # Search.setIndex({"docnames": [...], ...}) -- older builds leave the keys unquoted
+    match = re.search(r'"?docnames"?\s*:\s*(\[.*?\])', response.text, re.DOTALL)
+    if not match:
+        return []
+    return [urljoin(root, docname + '.html') for docname in json.loads(match.group(1))]
+
+def _docnames_from_objects_inv(root):
+    response = http_client.get(urljoin(root, 'objects.inv'))
+    response.raise_for_status()
+    # Four plain-text header lines followed by a zlib-compressed inventory
+    header_end = 0
+    for _ in range(4):
+        header_end = response.content.index(b'\n', header_end) + 1
+    inventory = zlib.decompress(response.content[header_end:]).decode('utf-8')
+
+    urls = []
+    for line in inventory.splitlines():
+        match = re.match(r'(.+?)\s+std:doc\s+-?\d+\s+(\S*)', line)
+        if match:
+            uri = match.group(2).replace('$', match.group(1))
+            urls.append(urljoin(root, uri.split('#')[0]))
+    return urls
+
+def _docnames_from_sitemap(root):
+    response = http_client.get(urljoin(root, 'sitemap.xml'))
+    response.raise_for_status()
+    soup = parse(response.content)
+    return [clean_text(loc.get_text()) for loc in soup.find_all('loc')]
+
+def discover_odoo_articles(url):
+    """List every article URL under url from the Sphinx build's own indexes.
+
+    Tries searchindex.js, then objects.inv, then sitemap.xml, so a whole
+    subtree (including pages nothing links to) is known from one request.
+    Category index pages are left out, as link discovery does. Returns None
+    when no index could be read.
+    """
+    try:
+        root = _sphinx_root(url)
+    except Exception as e:
+        print(f"Error locating Sphinx root for {url}: {e}")
+        return None
+    if not root:
+        return None
+
+    for source in (_docnames_from_searchindex, _docnames_from_objects_inv, _docnames_from_sitemap):
+        try:
+            candidates = source(root)
+        except Exception as e:
+            print(f"Sphinx discovery via {source.__name__} failed: {e}")
+            continue
+        if candidates:
+            # Every directory above a page, up to the root, is a category
+            categories = set()
+            for candidate in candidates:
+                path = candidate
+                while '/' in path[len(root):]:
+                    path = path[:path.rindex('/')]
+                    categories.add(path + '/')
+            article_urls = []
+            seen = set()
+            for article_url in candidates:
+                if (article_url.startswith(url) and article_url.endswith('.html') and article_url not in seen
+                        and not _is_category_index(article_url, categories)):
+                    seen.add(article_url)
+                    article_urls.append(article_url)
+            print(f"Discovered {len(article_urls)} articles under {url} from {source.__name__}")
+            return article_urls
+    return None
+
+def _fetch_articles(article_urls, max_workers=8, executor=None, changes=None, frontier=None):
+    if frontier is not None:
+        frontier.add_all(article_urls)
+    if executor is None or frontier is not None:
+        # Checkpointing needs the frontier in this process, which the pipeline keeps
+        with Pipeline(fetch_workers=max_workers) as pipeline:
+            for data in pipeline.map(_fetch_page, odoo_article_from_page, article_urls, changes, frontier):
+                if data:
+                    yield data
+        return
+    # map() yields in planned order as soon as each page and those before it are done
+    for url, data in zip(article_urls, executor.map(partial(scrape_odoo_article, changes=changes), article_urls)):
+        if data:
+            yield data
+        elif changes is not None:
+            changes.mark_failed(url)
+
+def scrape_odoo(url, max_workers=8, max_depth=None, max_pages=None, executor=None, changes=None, discovery='links', frontier=None, writer=None):
+    """Scrape an Odoo article or documentation subtree into Markdown.
+
+    discovery='links' follows links from category pages; discovery='sphinx'
+    plans the whole crawl up front from the site's search index and only
+    fetches article pages. When a ManifestRun is passed as changes, only
+    articles whose content changed since the previous run are converted
+    and emitted. A CrawlFrontier checkpoints progress so an interrupted
+    crawl can be resumed. Each article's Markdown goes to writer (a
+    MarkdownWriter) as soon as it is in order; the default one buffers it
+    and the whole export is returned.
+    """
     print(f"Starting Odoo Scrape for: {url}")
     
     # Ensure URL ends with / if it's a directory to help logic (optional but good for consistency)
     if not url.endswith('.html') and not url.endswith('/'):
         url += '/'
 
-    articles_data = _scrape_recursive(url)
+    article_urls = None
+    if discovery == 'sphinx' and not url.endswith('.html'):
+        article_urls = discover_odoo_articles(url)
+        if article_urls is None:
+            print("Sphinx index unavailable, falling back to link discovery.")
+
+    if article_urls is not None:
+        if changes is not None and max_pages is not None and len(article_urls) > max_pages:
+            changes.mark_incomplete()
+        articles_data = _fetch_articles(article_urls[:max_pages], max_workers=max_workers, executor=executor, changes=changes, frontier=frontier)
+    else:
+        articles_data = _crawl(url, max_workers=max_workers, max_depth=max_depth, max_pages=max_pages, executor=executor, changes=changes, frontier=frontier)
 
+    writer = writer or MarkdownWriter()
     # Dedup just in case
-    # Convert list of dicts to unique by URL
     seen_urls = set()
-    unique_articles = []
-    for art in articles_data:
-        if art['url'] not in seen_urls:
-            seen_urls.add(art['url'])
-            unique_articles.append(art)
-    
-    articles_data = unique_articles
-    print(f"Found {len(articles_data)} unique articles.")
-
-    # Format Output
-    final_md = ""
     for article in articles_data:
-        final_md += f"# {article['article_name']}\n"
-        final_md += f"**Link**: {article['url']}\n"
-        for k, v in article['levels'].items():
-            final_md += f"**{k.replace('_', ' ').title()}**: {v}\n"
-        final_md += "\n"
-        final_md += article['content']
-        final_md += "\n---\n\n"
-        
-    return final_md
+        if article['url'] in seen_urls:
+            continue
+        seen_urls.add(article['url'])
+        if changes is not None and not changes.is_delta(article['url']):
+            continue
+        writer.write_article(article, format_odoo_article(article))
+    print(f"Found {len(seen_urls)} unique articles.")
+    return writer.getvalue()
+
+def format_odoo_article(article):
+    lines = [f"# {article['article_name']}\n", f"**Link**: {article['url']}\n"]
+    for k, v in article['levels'].items():
+        lines.append(f"**{k.replace('_', ' ').title()}**: {v}\n")
+    lines += ["\n", article['content'], "\n---\n\n"]
+    return "".join(lines)
@@ -0,0 +1,216 @@
+"""Record/replay archive of fetched pages.
+
+Record mode stores every page the scrapers load (Selenium `page_source` or the
+HTTP body) together with its URL and fetch time. Replay mode runs the scrape
+functions against that archive with no browser or network, spreading the
+per-article conversion across all CPU cores.
+
+    python -m scrapers.page_archive toddle https://support.toddleapp.com/en/collections/8595214-educators
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from scrapers.http_cache import CACHE_DIR
+from scrapers.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_PATH = os.path.join(CACHE_DIR, 'page_archive.sqlite3')
+
+EMPTY_PAGE = "<html><head></head><body></body></html>"
+
+class PageArchive:
+    """zlib-compressed page bodies keyed by URL, stored in a single SQLite file."""
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " body BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def record(self, url, body):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fetched_at, body) VALUES (?, ?, ?)",
+                (url, time.time(), zlib.compress(body))
+            )
+            self._conn.commit()
+
+    def load(self, url):
+        """Return the archived body for url as bytes, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def urls(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT url FROM pages ORDER BY url")]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class RecordingDriver:
+    """Wraps a live WebDriver and archives `page_source` for every page it reads."""
+
+    records = True
+
+    def __init__(self, driver, archive):
+        self._driver = driver
+        self._archive = archive
+        self._requested_url = None
+
+    def get(self, url):
+        self._requested_url = url
+        return self._driver.get(url)
+
+    @property
+    def page_source(self):
+        source = self._driver.page_source
+        # Key by the URL the scraper asked for so replay finds it even after redirects
+        self._archive.record(self._requested_url or self._driver.current_url, source)
+        return source
+
+    def record(self, url, html):
+        """Archive a page read without loading it (e.g. fetched from inside the page)."""
+        self._archive.record(url, html)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+class ReplayDriver:
+    """Stand-in for a WebDriver that serves `page_source` from a PageArchive."""
+
+    replay = True
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.current_url = None
+
+    def get(self, url):
+        self.current_url = url
+
+    @property
+    def page_source(self):
+        body = self.archive.load(self.current_url)
+        if body is None:
+            logger.warning(f"Page not in archive: {self.current_url}")
+            return EMPTY_PAGE
+        return body.decode('utf-8')
+
+    def execute_script(self, script, *args):
+        return None
+
+    def quit(self):
+        pass
+
+# Per-process archive handle for replay workers
+_worker_archive = None
+
+def _init_replay_worker(archive_path):
+    global _worker_archive
+    _worker_archive = PageArchive(archive_path)
+    http_client.start_replay(_worker_archive)
+
+def _replay_toddle_article(job):
+    from scrapers.toddle_scraper import ToddleScraper
+    article_url, entity, topic = job
+    return ToddleScraper(ReplayDriver(_worker_archive)).scrape_article(article_url, entity, topic)
+
+def _replay_isams_article(article_url):
+    from scrapers.isams_developer_scraper import IsamsDeveloperScraper
+    return IsamsDeveloperScraper(ReplayDriver(_worker_archive)).scrape_article(article_url)
+
+def _replay_pool(archive_path, workers):
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               initializer=_init_replay_worker, initargs=(archive_path,))
+
+def replay_toddle(url, archive_path=DEFAULT_ARCHIVE_PATH, workers=None):
+    """Re-run scrape_toddle against an archive. Returns (articles, markdown)."""
+    from scrapers.toddle_scraper import ToddleScraper, scrape_toddle, format_articles_to_markdown
+    archive = PageArchive(archive_path)
+    driver = ReplayDriver(archive)
+    if '/collections/' not in url and '/topics/' not in url:
+        return scrape_toddle(url, driver)
+
+    collection_name, jobs = ToddleScraper(driver).plan_collection(url)
+    with _replay_pool(archive_path, workers) as pool:
+        results = pool.map(_replay_toddle_article,
+                           [(article_url, collection_name, topic) for article_url, topic in jobs],
+                           chunksize=8)
+        articles = [a for a in results if a]
+    return articles, format_articles_to_markdown(articles)
+
+def replay_isams_developer(url, archive_path=DEFAULT_ARCHIVE_PATH, workers=None):
+    """Re-run scrape_isams_developer against an archive. Returns markdown."""
+    from scrapers.isams_developer_scraper import IsamsDeveloperScraper, format_isams_developer_markdown
+    archive = PageArchive(archive_path)
+    scraper = IsamsDeveloperScraper(ReplayDriver(archive))
+    main_article = scraper.scrape_article(url)
+    if not main_article:
+        return "Failed to scrape main article."
+
+    base_path = urlparse(url).path
+    sub_links = [l for l in scraper.discover_links(url) if urlparse(l).path.startswith(base_path) and l != url]
+    with _replay_pool(archive_path, workers) as pool:
+        sub_articles = [a for a in pool.map(_replay_isams_article, sub_links) if a]
+    return format_isams_developer_markdown([main_article] + sub_articles)
+
+def replay_odoo(url, archive_path=DEFAULT_ARCHIVE_PATH, workers=None):
+    from scrapers.odoo_scraper import scrape_odoo
+    http_client.start_replay(PageArchive(archive_path))
+    with _replay_pool(archive_path, workers) as pool:
+        return scrape_odoo(url, executor=pool)
+
+def replay_prompting_guide(url, archive_path=DEFAULT_ARCHIVE_PATH, workers=None):
+    from scrapers.prompting_guide_scraper import scrape_prompting_guide
+    http_client.start_replay(PageArchive(archive_path))
+    with _replay_pool(archive_path, workers) as pool:
+        return scrape_prompting_guide(url, executor=pool)
+
+REPLAYERS = {
+    'toddle': lambda url, path, workers: replay_toddle(url, path, workers)[1],
+    'isams-developer': replay_isams_developer,
+    'odoo': replay_odoo,
+    'prompting-guide': replay_prompting_guide,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run a scrape against a recorded page archive.")
+    parser.add_argument('scraper', choices=sorted(REPLAYERS))
+    parser.add_argument('url')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Write the markdown here instead of stdout")
+    args = parser.parse_args()
+
+    started = time.time()
+    markdown = REPLAYERS[args.scraper](args.url, args.archive, args.workers)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+    else:
+        print(markdown)
+    logger.info(f"Replayed {args.url} in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
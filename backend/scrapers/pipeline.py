@@ -0,0 +1,220 @@
+"""Fetch -> parse+convert -> write as overlapping stages.
+
+Fetching a page is I/O bound and runs on a thread pool. Parsing it and
+converting it to Markdown is CPU bound (BeautifulSoup is pure Python), so
+that step runs in a shared process pool, where the GIL does not hold it to
+one core. The caller consumes the records and writes them, in input order.
+
+Pipeline.map keeps at most max_in_flight pages between fetch and write.
+When the writer or the converters fall behind, fetching waits instead of
+piling pages up in memory.
+
+Convert functions run in another process, so they must be module-level
+functions taking (url, page, changes). A ManifestRun cannot cross the
+process boundary. The parent therefore sends the page's stored hash along,
+the worker hashes the content region and only converts it when the hash
+differs, and the parent then records the result in the manifest. A
+CrawlFrontier is likewise updated in the parent, the way run_tracked would.
+
+The pool forks its workers from a forkserver, not from the threaded server
+process, and main.py starts it at start-up.
+"""
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from scrapers.frontier import DONE, FAILED
+from scrapers.manifest import content_hash
+
+# Size of the shared convert pool; main.py sets it from SCRAPER_CONVERT_WORKERS.
+# With fewer than 2 workers pages are converted on the fetch threads instead.
+convert_workers = os.cpu_count()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def convert_pool():
+    """The process pool shared by all pipelines, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=convert_workers,
+                                        mp_context=multiprocessing.get_context("forkserver"))
+        return _pool
+
+def start():
+    """Start the convert pool (and its forkserver) ahead of the first scrape, if it is used at all."""
+    if (convert_workers or 0) >= 2:
+        convert_pool().submit(os.getpid).result()
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+class _RegionRecorder:
+    """Stands in for a ManifestRun in a worker: hashes the region and converts it only if it changed."""
+
+    def __init__(self, stored_hash):
+        self.stored_hash = stored_hash
+        self.region_hash = None
+
+    def convert(self, url, region_html, convert):
+        self.region_hash = content_hash(region_html)
+        if self.region_hash == self.stored_hash:
+            # The parent fills in the stored Markdown
+            return None
+        return convert()
+
+def _convert_in_worker(convert, url, page, track_changes, stored_hash=None):
+    recorder = _RegionRecorder(stored_hash) if track_changes else None
+    return convert(url, page, recorder), recorder.region_hash if recorder else None
+
+def _fetch_and_convert(fetch, convert, url, changes):
+    page = fetch(url)
+    return convert(url, page, changes) if page is not None else None
+
+def _resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+def then(future, fn):
+    """Future of fn(future.result())."""
+    chained = Future()
+
+    def done(future):
+        try:
+            chained.set_result(fn(future.result()))
+        except BaseException as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
+
+class Pipeline:
+    def __init__(self, fetch_workers=8, executor=None, max_in_flight=None):
+        self.fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers)
+        self.executor = executor
+        self.max_in_flight = max_in_flight or 4 * fetch_workers
+        self._tracked = set()       # futures whose callbacks still update a frontier or ManifestRun
+        self._tracked_lock = threading.Lock()
+
+    def submit(self, fetch, convert, url, changes=None, frontier=None):
+        """Future of convert(url, fetch(url), changes); None if fetch returned None.
+
+        convert's record must keep its Markdown under 'content' for the change
+        check. With a frontier, done URLs resolve to their stored record and
+        failed ones to None without being fetched. Like run_tracked, served
+        records are kept in the ManifestRun and failures reported to it.
+        """
+        if frontier is not None:
+            state = frontier.state(url)
+            if state == DONE:
+                record = frontier.record(url)
+                if changes is not None and record:
+                    changes.keep(url, record.get('content'))
+                return _resolved(record)
+            if state == FAILED:
+                if changes is not None:
+                    changes.mark_failed(url)
+                return _resolved(None)
+            if state is None:
+                frontier.add(url)
+            frontier.start(url)
+        elif changes is None:
+            return self._submit(fetch, convert, url, changes)
+        tracked = Future()
+        with self._tracked_lock:
+            self._tracked.add(tracked)
+        tracked.add_done_callback(self._untrack)
+
+        def done(future):
+            try:
+                record = future.result()
+            except CancelledError as e:
+                # Stopped by close(): the URL stays in flight, and a resume queues it again
+                tracked.set_exception(e)
+                return
+            except BaseException as e:
+                if frontier is not None:
+                    frontier.fail(url, e)
+                if changes is not None:
+                    changes.mark_failed(url)
+                tracked.set_exception(e)
+                return
+            if record is None:
+                if frontier is not None:
+                    frontier.fail(url, "no result")
+                if changes is not None:
+                    changes.mark_failed(url)
+            elif frontier is not None:
+                frontier.complete(url, record)
+            tracked.set_result(record)
+
+        self._submit(fetch, convert, url, changes).add_done_callback(done)
+        return tracked
+
+    def _submit(self, fetch, convert, url, changes):
+        if self.executor is None and (convert_workers or 0) < 2:
+            # One core: a process hop would only add pickling
+            return self.fetch_pool.submit(_fetch_and_convert, fetch, convert, url, changes)
+        executor = self.executor or convert_pool()
+        result = Future()
+
+        def converted(future):
+            try:
+                record, region_hash = future.result()
+                if changes is not None and record is not None and region_hash is not None:
+                    record['content'] = changes.convert_hashed(url, region_hash, lambda: record['content'])
+            except BaseException as e:
+                result.set_exception(e)
+            else:
+                result.set_result(record)
+
+        def fetched(future):
+            try:
+                page = future.result()
+                if page is None:
+                    result.set_result(None)
+                    return
+                stored = changes.stored(url) if changes is not None else None
+                executor.submit(_convert_in_worker, convert, url, page, changes is not None,
+                                stored[0] if stored else None).add_done_callback(converted)
+            except BaseException as e:
+                result.set_exception(e)
+
+        self.fetch_pool.submit(fetch, url).add_done_callback(fetched)
+        return result
+
+    def map(self, fetch, convert, urls, changes=None, frontier=None):
+        """Yield the record of every url in order, each as soon as it and those before it are done."""
+        window = deque()
+        for url in urls:
+            window.append(self.submit(fetch, convert, url, changes, frontier))
+            if len(window) >= self.max_in_flight:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+    def _untrack(self, future):
+        with self._tracked_lock:
+            self._tracked.discard(future)
+
+    def close(self):
+        """Stop fetching, and wait for the pages already fetched so that no callback
+        touches the caller's frontier or ManifestRun after it has been closed."""
+        self.fetch_pool.shutdown(cancel_futures=True)
+        with self._tracked_lock:
+            tracked = list(self._tracked)
+        wait(tracked)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,198 @@
+"""Per-host politeness: token-bucket pacing, AIMD concurrency and retry backoff.
+
+Every fetch of a host goes through that host's HostLimiter. The limiter caps the
+request rate with a token bucket and the number of requests in flight. Both are
+adjusted AIMD-style: after a run of healthy responses the concurrency limit grows
+by one and the rate by rate_step (up to max_rate), and both halve on 429/5xx or
+when latency rises well above its running baseline. `rate` is only the starting
+point; main.py sets it (and burst) from SCRAPER_HOST_RATE / SCRAPER_HOST_BURST,
+and Politeness.host_overrides can set any limiter option per host.
+"""
+import random
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HostLimiter:
+    def __init__(self, host, rate=4.0, burst=4, min_rate=0.5, max_rate=32.0, rate_step=1.0,
+                 min_concurrency=1, max_concurrency=16, initial_concurrency=4,
+                 latency_factor=2.0, latency_slack=0.5):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.rate_step = rate_step
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = initial_concurrency
+        self.latency_factor = latency_factor
+        # Ignore latency swings smaller than this many seconds (local jitter)
+        self.latency_slack = latency_slack
+        self.in_flight = 0
+        self.baseline_latency = None
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._healthy_streak = 0
+        self._not_before = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Block until a concurrency slot and a rate token are both available."""
+        self.acquire_batch(1)
+
+    def acquire_batch(self, n):
+        """acquire() for up to n requests sent together; returns how many may go now (at least 1).
+
+        Each granted request holds its own slot and token, and is given back with its own release().
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.in_flight < self.concurrency and self._tokens >= 1 and now >= self._not_before:
+                    granted = min(n, self.concurrency - self.in_flight, int(self._tokens))
+                    self._tokens -= granted
+                    self.in_flight += granted
+                    return granted
+                if self.in_flight >= self.concurrency:
+                    self._cond.wait()
+                else:
+                    wait_for = max((1 - self._tokens) / self.rate, self._not_before - now)
+                    self._cond.wait(timeout=max(wait_for, 0.01))
+
+    def release(self, status_code=None, latency=None):
+        """Return the slot and feed the outcome into the AIMD controller."""
+        with self._cond:
+            self.in_flight -= 1
+            if status_code in RETRY_STATUSES:
+                self._decrease(f"HTTP {status_code}")
+            elif latency is not None:
+                if self.baseline_latency is None:
+                    self.baseline_latency = latency
+                if latency > max(self.baseline_latency * self.latency_factor, self.baseline_latency + self.latency_slack):
+                    self._decrease(f"latency {latency:.2f}s")
+                else:
+                    self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+                    self._increase()
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Hold back every request to this host for the given time (e.g. Retry-After)."""
+        with self._cond:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+    def _increase(self):
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.concurrency:
+            self._healthy_streak = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+
+    def _decrease(self, reason):
+        self._healthy_streak = 0
+        new_limit = max(self.min_concurrency, self.concurrency // 2)
+        new_rate = max(self.min_rate, self.rate / 2)
+        if new_limit != self.concurrency or new_rate != self.rate:
+            logger.info(f"{self.host}: backing off to {new_limit} concurrent requests, {new_rate:.1f} req/s ({reason})")
+        self.concurrency = new_limit
+        self.rate = new_rate
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for a request whose outcome is not reported (e.g. a browser navigation)."""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(latency=time.monotonic() - started)
+
+class Politeness:
+    """Registry of HostLimiters plus the shared retry policy."""
+
+    def __init__(self, max_retries=4, backoff_base=1.0, backoff_cap=60.0, **limiter_defaults):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limiter_defaults = limiter_defaults
+        self.host_overrides = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                options = dict(self.limiter_defaults)
+                options.update(self.host_overrides.get(host, {}))
+                limiter = HostLimiter(host, **options)
+                self._limiters[host] = limiter
+            return limiter
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt (0-based)."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def call(self, url, send):
+        """Run send() under url's host limiter, retrying connection errors and 429/5xx."""
+        limiter = self.limiter(url)
+        attempt = 0
+        while True:
+            limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                limiter.release(status_code=503)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"Request to {url} failed ({e}); retrying in {delay:.1f}s")
+            except BaseException:
+                # A bad URL or a bug, not the host's doing: free the slot and leave the AIMD state alone
+                limiter.release()
+                raise
+            else:
+                limiter.release(response.status_code, time.monotonic() - started)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = self.backoff(attempt, retry_after)
+                if retry_after is not None:
+                    limiter.pause(delay)
+                logger.warning(f"{url} returned {response.status_code}; retrying in {delay:.1f}s")
+            attempt += 1
+            time.sleep(delay)
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+politeness = Politeness()
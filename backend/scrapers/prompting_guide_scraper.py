@@ -1,19 +1,128 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
+from functools import partial
+from scrapers.http_client import http_client
+from scrapers.html_parser import parse
+from scrapers.markdown import BlockConverter
+from scrapers.markdown_writer import MarkdownWriter
+from scrapers.pipeline import Pipeline
 
 def clean_text(text):
     if not text:
         return ""
     return re.sub(r'\s+', ' ', text).strip()
 
-def scrape_prompting_guide_article(url):
+def _fetch_soup(url, region=None):
+    response = http_client.get(url)
+    response.raise_for_status()
+    return parse(response.content, region=region)
+
+def _fetch_page(url):
+    """Download url, or report the error and return None."""
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        return response.content
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
+
+def article_from_page(url, page, changes=None):
+    """Parse and convert a downloaded sub-article (runs in pipeline worker processes)."""
+    return scrape_prompting_guide_article(url, parse(page, region='prompting_guide_article'), changes)
+
+def _is_code_block(block):
+    return block.name == 'pre' or (block.name == 'div' and 'nextra-code-block' in block.get('class', []))
+
+class PromptingGuideMarkdown(BlockConverter):
+    """Nextra page body to Markdown; "Prompt:"/"Output:" labels are joined with their code blocks."""
+
+    block_names = ['h2', 'h3', 'h4', 'p', 'ul', 'ol', 'pre', 'div']
+
+    def convert_block(self, i):
+        block = self.blocks[i]
+        classes = block.get('class', [])
+        if any(c in classes for c in ['nextra-breadcrumb', 'nx-mb-8', 'nx-mt-16']):
+            return i + 1
+
+        # Flexible Label Detection (Prompt/Output)
+        label = self.dom.short_text(block, len('Prompt:')) if block.name == 'p' else None
+        label_match = re.match(r'^(Prompt|Output):?$', label or '', re.IGNORECASE)
+        if label_match:
+            label_type = label_match.group(1).capitalize()
+            j = next((j for j in range(i + 1, min(i + 4, len(self.blocks))) if _is_code_block(self.blocks[j])), None)
+            if j is not None:
+                self.labelled(label_type, self.blocks[j])
+                self.mark_one(i)
+                self.mark_seen(j)
+                # A Prompt is often followed directly by its Output code block
+                if label_type == 'Prompt':
+                    k = self.find_output(j + 1)
+                    if k is not None:
+                        self.labelled('Output', self.blocks[k])
+                        self.mark_seen(k)
+                        return k + 1
+                return j + 1
+
+        is_code_block = _is_code_block(block)
+        if block.name == 'div' and not is_code_block:
+            return i + 1
+
+        # Mark as seen and skip children to avoid duplication
+        self.mark_seen(i)
+        if block.name in ['h2', 'h3', 'h4']:
+            level = int(block.name[1])
+            title = clean_text(self.dom.text(block)).replace('#', '')
+            self.emit(f"{'#' * level} {title}\n\n")
+        elif block.name == 'p':
+            p_text = clean_text(self.dom.text(block))
+            if p_text:
+                self.emit(f"{p_text}\n\n")
+        elif block.name in ['ul', 'ol']:
+            for k, li in enumerate(block.find_all('li', recursive=False)):
+                li_text = clean_text(self.dom.text(li))
+                if li_text:
+                    self.emit(f"{k+1}. {li_text}\n" if block.name == 'ol' else f"- {li_text}\n")
+            self.emit("\n")
+        elif is_code_block:
+            code = block.find('code')
+            if code:
+                lang = code.get('data-language', '') or ""
+                if not lang:
+                    for c in code.get('class', []):
+                        if c.startswith('language-'):
+                            lang = c.replace('language-', '')
+                            break
+                self.fenced(self.dom.text(code), lang)
+        return i + 1
+
+    def labelled(self, label_type, code_block):
+        code = code_block.find('code')
+        code_text = self.dom.text(code).strip() if code else ""
+        lang = code.get('data-language', '') if code else ""
+        self.labelled_code(label_type, code_text, lang)
+
+    def find_output(self, k):
+        """Index of the code block within the next 15 unseen blocks, unless a paragraph comes first."""
+        count = 0
+        while k < len(self.blocks) and count < 15:
+            b = self.blocks[k]
+            if self.is_seen(k):
+                k += 1
+                continue
+            count += 1
+            if _is_code_block(b):
+                return k
+            elif b.name == 'p' and self.dom.has_text(b):  # Stop if there is other text
+                return None
+            k += 1
+        return None
+
+def scrape_prompting_guide_article(url, soup=None, changes=None):
+    try:
+        # Callers that already fetched the page pass its tree in to avoid a second download
+        if soup is None:
+            soup = _fetch_soup(url, region='prompting_guide_article')
 
         # Extract Hierarchy from URL
         parsed_url = urlparse(url)
@@ -35,137 +144,14 @@ def scrape_prompting_guide_article(url):
         main_content = soup.find('main')
         content_md = ""
         
+        def convert():
+            return PromptingGuideMarkdown(main_content).convert()
+
         if main_content:
-            blocks = main_content.find_all(['h2', 'h3', 'h4', 'p', 'ul', 'ol', 'pre', 'div'], recursive=True)
-            
-            seen_elements = set()
-            i = 0
-            while i < len(blocks):
-                block = blocks[i]
-                if block in seen_elements:
-                    i += 1
-                    continue
-                
-                classes = block.get('class', [])
-                if any(c in classes for c in ['nextra-breadcrumb', 'nx-mb-8', 'nx-mt-16']):
-                    i += 1
-                    continue
-                
-                text = block.get_text().strip()
-                
-                # Flexible Label Detection (Prompt/Output)
-                label_match = re.match(r'^(Prompt|Output):?$', text, re.IGNORECASE)
-                if label_match and block.name in ['p', 'em', 'strong']:
-                    label_type = label_match.group(1).capitalize()
-                    # Try to find the associated code block
-                    code_block = None
-                    for j in range(i + 1, min(i + 4, len(blocks))):
-                        b = blocks[j]
-                        if (b.name == 'pre') or (b.name == 'div' and 'nextra-code-block' in b.get('class', [])):
-                            code_block = b
-                            break
-                    
-                    if code_block:
-                        code = code_block.find('code')
-                        code_text = code.get_text().strip() if code else ""
-                        lang = code.get('data-language', '') if code else ""
-                        
-                        # Friendly formatting
-                        if '\n' not in code_text and len(code_text) < 150:
-                            content_md += f"**{label_type}**: `{code_text}`\n\n"
-                        else:
-                            content_md += f"**{label_type}**:\n```{lang}\n{code_text}\n```\n\n"
-                        
-                        seen_elements.add(block)
-                        seen_elements.add(code_block)
-                        for child in code_block.find_all(True):
-                             seen_elements.add(child)
-                        
-                        # Look Ahead: Is there a second code block immediately following this one?
-                        # If so, it might be the Output (if this was a Prompt)
-                        if label_type == 'Prompt':
-                            next_code = None
-                            k = j + 1
-                            count = 0
-                            while k < len(blocks) and count < 15:
-                                b = blocks[k]
-                                if b in seen_elements:
-                                    k += 1
-                                    continue
-                                count += 1
-                                if (b.name == 'pre') or (b.name == 'div' and 'nextra-code-block' in b.get('class', [])):
-                                    next_code = b
-                                    break
-                                elif b.name == 'p' and b.get_text().strip(): # Stop if there is other text
-                                    break
-                                k += 1
-                            
-                            if next_code:
-                                n_code = next_code.find('code')
-                                n_text = n_code.get_text().strip() if n_code else ""
-                                n_lang = n_code.get('data-language', '') if n_code else ""
-                                if '\n' not in n_text and len(n_text) < 150:
-                                    content_md += f"**Output**: `{n_text}`\n\n"
-                                else:
-                                    content_md += f"**Output**:\n```{n_lang}\n{n_text}\n```\n\n"
-                                seen_elements.add(next_code)
-                                for child in next_code.find_all(True):
-                                     seen_elements.add(child)
-                                i = k + 1
-                            else:
-                                i = j + 1
-                        else:
-                            i = j + 1
-                        continue
-
-                # Check if it's a code block
-                is_code_block = (block.name == 'pre') or (block.name == 'div' and 'nextra-code-block' in classes)
-                
-                # If it's a div but not a code block, we might not want it directly
-                if block.name == 'div' and not is_code_block:
-                    i += 1
-                    continue
-                
-                # Mark as seen and skip children to avoid duplication
-                seen_elements.add(block)
-                for child in block.find_all(True):
-                    seen_elements.add(child)
-                
-                # Process the block
-                if block.name in ['h2', 'h3', 'h4']:
-                    level = int(block.name[1])
-                    title = clean_text(block.get_text()).replace('#', '')
-                    content_md += f"{'#' * level} {title}\n\n"
-                elif block.name == 'p':
-                    # Only if not already processed as label
-                    p_text = clean_text(block.get_text())
-                    if p_text:
-                        content_md += f"{p_text}\n\n"
-                elif block.name == 'ul':
-                    for li in block.find_all('li', recursive=False):
-                        li_text = clean_text(li.get_text())
-                        if li_text:
-                            content_md += f"- {li_text}\n"
-                    content_md += "\n"
-                elif block.name == 'ol':
-                    for k, li in enumerate(block.find_all('li', recursive=False)):
-                        li_text = clean_text(li.get_text())
-                        if li_text:
-                            content_md += f"{k+1}. {li_text}\n"
-                    content_md += "\n"
-                elif is_code_block:
-                    code = block.find('code')
-                    if code:
-                        lang = code.get('data-language', '') or ""
-                        if not lang:
-                            for c in code.get('class', []):
-                                if c.startswith('language-'):
-                                    lang = c.replace('language-', '')
-                                    break
-                        code_text = code.get_text()
-                        content_md += f"```{lang}\n{code_text}\n```\n\n"
-                
-                i += 1
+            if changes is not None:
+                content_md = changes.convert(url, str(main_content), convert)
+            else:
+                content_md = convert()
 
         return {
             "url": url,
@@ -178,66 +164,96 @@ def scrape_prompting_guide_article(url):
         print(f"Error scraping {url}: {e}")
         return None
 
-def scrape_prompting_guide(url):
-    articles_data = []
-    seen_urls = set()
+def _discover_sub_articles(url, soup):
+    """Return sub-article URLs linked from the sidebar or body of an already parsed page."""
+    sidebar = soup.select_one('.nextra-sidebar-container, .nextra-scrollbar, aside')
+    main_tag = soup.find('main')
+    
+    potential_links = []
+    if sidebar:
+        potential_links.extend(sidebar.find_all('a', href=True))
+    if main_tag:
+        potential_links.extend(main_tag.find_all('a', href=True))
+        
+    # Filter for sub-articles
+    # Normalize base URL for comparison
+    base_url = url.rstrip('/')
+    
+    sub_urls = []
+    seen_urls = {url}
+    for link in potential_links:
+        href = link['href']
+        full_url = urljoin(url, href).split('#')[0].rstrip('/')
+        
+        # Heuristic: must start with the base URL and be a direct sub-path or logically related
+        # We also want to avoid going to a completely different section if we are at /introduction
+        if full_url.startswith(base_url) and full_url != base_url:
+            if full_url not in seen_urls:
+                seen_urls.add(full_url)
+                sub_urls.append(full_url)
+    return sub_urls
+
+def scrape_prompting_guide(url, max_workers=8, executor=None, changes=None, frontier=None, writer=None):
+    """Scrape a Prompting Guide page and its sub-articles into Markdown.
+
+    When a ManifestRun is passed as changes, only articles whose content
+    changed since the previous run are converted and emitted. A CrawlFrontier
+    checkpoints each sub-article so an interrupted run can be resumed. Each
+    article's Markdown goes to writer (a MarkdownWriter) as soon as it is in
+    order; the default one buffers it and the whole export is returned.
+    """
+    writer = writer or MarkdownWriter()
+
+    def emit(article):
+        if not article['content'].strip():
+            return
+        if changes is not None and not changes.is_delta(article['url']):
+            return
+        writer.write_article(article, format_prompting_guide_article(article))
+
+    # Fetch and parse the seed page once; the same tree feeds content extraction and link discovery
+    soup = None
+    try:
+        soup = _fetch_soup(url)
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
     
-    # Scrape the initial URL
-    data = scrape_prompting_guide_article(url)
+    data = scrape_prompting_guide_article(url, soup, changes) if soup is not None else None
     if data:
-        articles_data.append(data)
-        seen_urls.add(url)
+        emit(data)
         
         # Try to find more links
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            response = requests.get(url, headers=headers)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            sidebar = soup.select_one('.nextra-sidebar-container, .nextra-scrollbar, aside')
-            main_tag = soup.find('main')
-            
-            potential_links = []
-            if sidebar:
-                potential_links.extend(sidebar.find_all('a', href=True))
-            if main_tag:
-                potential_links.extend(main_tag.find_all('a', href=True))
-                
-            # Filter for sub-articles
-            # Normalize base URL for comparison
-            base_url = url.rstrip('/')
-            
-            for link in potential_links:
-                href = link['href']
-                full_url = urljoin(url, href).split('#')[0].rstrip('/')
-                
-                # Heuristic: must start with the base URL and be a direct sub-path or logically related
-                # We also want to avoid going to a completely different section if we are at /introduction
-                if full_url.startswith(base_url) and full_url != base_url:
-                    if full_url not in seen_urls:
-                        # print(f"Found sub-article: {full_url}")
-                        seen_urls.add(full_url)
-                        
-                        sub_data = scrape_prompting_guide_article(full_url)
-                        # Only add if it has actual content
-                        if sub_data and sub_data['content'].strip():
-                            articles_data.append(sub_data)
+            sub_urls = _discover_sub_articles(url, soup)
+            if frontier is not None:
+                frontier.add_all(sub_urls)
+            if executor is None or frontier is not None:
+                # Download on threads, parse and convert in worker processes. Checkpointing
+                # needs the frontier in this process, which the pipeline keeps.
+                with Pipeline(fetch_workers=max_workers) as pipeline:
+                    for sub_data in pipeline.map(_fetch_page, article_from_page, sub_urls, changes, frontier):
+                        if sub_data:
+                            emit(sub_data)
+            else:
+                # map() keeps results in discovery order while the pages download concurrently
+                for sub_url, sub_data in zip(sub_urls, executor.map(partial(scrape_prompting_guide_article, changes=changes), sub_urls)):
+                    if sub_data:
+                        emit(sub_data)
+                    elif changes is not None:
+                        changes.mark_failed(sub_url)
                             
         except Exception as e:
             print(f"Error finding sub-articles for {url}: {e}")
+            if changes is not None:
+                changes.mark_incomplete()
+    elif changes is not None:
+        changes.mark_incomplete()
 
-    # Format Output
-    final_md = ""
-    for article in articles_data:
-        if not article['content'].strip():
-            continue
-            
-        final_md += f"# {article['article_name']}\n"
-        final_md += f"**Link**: {article['url']}\n"
-        for k, v in article['levels'].items():
-            final_md += f"**{k.replace('_', ' ').title()}**: {v}\n"
-        final_md += "\n"
-        final_md += article['content']
-        final_md += "\n---\n\n"
-        
-    return final_md
+    return writer.getvalue()
+
+def format_prompting_guide_article(article):
+    lines = [f"# {article['article_name']}\n", f"**Link**: {article['url']}\n"]
+    for k, v in article['levels'].items():
+        lines.append(f"**{k.replace('_', ' ').title()}**: {v}\n")
+    lines += ["\n", article['content'], "\n---\n\n"]
+    return "".join(lines)
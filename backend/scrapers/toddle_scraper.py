@@ -1,9 +1,14 @@
-import time
 import re
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import Tag, NavigableString
 from urllib.parse import urljoin, urlparse
 import logging
 
+from scrapers.browser import navigate, page_region, prefetch, wait_until_ready
+from scrapers.frontier import run_tracked
+from scrapers.html_parser import parse
+from scrapers.markdown import BlockConverter
+from scrapers.markdown_writer import MarkdownWriter
+
 logger = logging.getLogger(__name__)
 
 def clean_text(text):
@@ -15,44 +20,78 @@ def clean_text(text):
 class ToddleScraper:
     """Scraper for Toddle documentation (support.toddleapp.com)"""
     
-    def __init__(self, driver):
+    def __init__(self, driver, changes=None, frontier=None, pool=None, on_article=None):
         self.driver = driver
         self.base_url = "https://support.toddleapp.com"
         self.seen_urls = set()
+        # Optional ManifestRun: skip re-converting articles whose content is unchanged
+        self.changes = changes
+        # Optional CrawlFrontier: checkpoint each article so a crashed run can resume
+        self.frontier = frontier
+        # Optional DriverPool: spread article pages across several browsers
+        self.pool = pool
+        # Optional callback for each collection article as soon as it is scraped
+        self.on_article = on_article
+
+    def plan_collection(self, collection_url):
+        """Load a collection page and return (collection_name, [(article_url, topic_name), ...])."""
+        navigate(self.driver, collection_url)
+        wait_until_ready(self.driver, 'toddle_collection')
+        
+        soup = parse(self.driver.page_source)
+        
+        # Extract collection name (Entity)
+        collection_name = self._extract_collection_name(soup)
+        logger.info(f"Scraping collection: {collection_name}")
+        
+        # Find all topics and their articles
+        jobs = []
+        topics = self._extract_topics_and_articles(soup, collection_name)
+        for topic_name, article_links in topics.items():
+            logger.info(f"Processing topic: {topic_name} ({len(article_links)} articles)")
+            for article_title, article_url in article_links:
+                if article_url in self.seen_urls:
+                    continue
+                self.seen_urls.add(article_url)
+                jobs.append((article_url, topic_name))
+        return collection_name, jobs
 
     def scrape_collection(self, collection_url):
         """Scrape all topics and articles from a collection."""
         try:
-            self.driver.get(collection_url)
-            time.sleep(4)
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            # Extract collection name (Entity)
-            collection_name = self._extract_collection_name(soup)
-            logger.info(f"Scraping collection: {collection_name}")
-            
-            # Find all topics and their articles
-            articles_data = []
-            topics = self._extract_topics_and_articles(soup, collection_name)
+            collection_name, jobs = self.plan_collection(collection_url)
+            if self.frontier is not None:
+                # Known up front, so progress reports see the whole collection
+                self.frontier.add_all([article_url for article_url, _ in jobs])
             
             # Scrape each article
-            for topic_name, article_links in topics.items():
-                logger.info(f"Processing topic: {topic_name} ({len(article_links)} articles)")
-                for article_title, article_url in article_links:
-                    if article_url in self.seen_urls:
-                        continue
-                    self.seen_urls.add(article_url)
-                    article_data = self.scrape_article(article_url, collection_name, topic_name)
-                    if article_data:
-                        articles_data.append(article_data)
-                    time.sleep(1)
+            if self.pool is not None:
+                # pool.map hands results back in topic order regardless of which browser finished first
+                results = self.pool.map(lambda driver, job: self._scrape_job(driver, job, collection_name), jobs)
+            else:
+                prefetch(self.driver, [article_url for article_url, _ in jobs])
+                results = (self._scrape_job(self.driver, job, collection_name) for job in jobs)
             
-            return articles_data
+            articles = []
+            for article_data in results:
+                if article_data:
+                    articles.append(article_data)
+                    if self.on_article is not None:
+                        self.on_article(article_data)
+            return articles
         except Exception as e:
             logger.error(f"Error scraping collection {collection_url}: {e}")
+            if self.changes is not None:
+                self.changes.mark_incomplete()
             return []
 
+    def _scrape_job(self, driver, job, collection_name):
+        article_url, topic_name = job
+        scraper = self if driver is self.driver else ToddleScraper(driver, self.changes)
+        return run_tracked(self.frontier, article_url,
+                           lambda: scraper.scrape_article(article_url, collection_name, topic_name),
+                           changes=self.changes)
+
     def _extract_collection_name(self, soup):
         # 1. Try breadcrumbs (usually richer)
         breadcrumb_els = soup.select('.intercom-breadcrumb a, .breadcrumb a, [data-testid="breadcrumb"] a')
@@ -123,9 +162,9 @@ class ToddleScraper:
     def scrape_article(self, url, entity=None, topic=None):
         """Scrape a single article with high-precision hierarchy and content extraction."""
         try:
-            self.driver.get(url)
-            time.sleep(4)
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            navigate(self.driver, url)
+            wait_until_ready(self.driver, 'toddle_article')
+            soup = parse(page_region(self.driver, 'toddle_article'), region='toddle_article')
             
             # 1. BREADCRUMBS / HIERARCHY
             breadcrumb_els = soup.select('.intercom-breadcrumb a, .breadcrumb a, [data-testid="breadcrumb"] a, nav a')
@@ -162,7 +201,7 @@ class ToddleScraper:
             if not title: title = "Untitled Article"
             
             # 3. CONTENT
-            content_md = self._extract_article_content(soup)
+            content_md = self._extract_article_content(soup, url)
             
             return {
                 "entity": entity,
@@ -175,7 +214,7 @@ class ToddleScraper:
             logger.error(f"Error scraping article {url}: {e}")
             return None
 
-    def _extract_article_content(self, soup):
+    def _extract_article_content(self, soup, url=None):
         selectors = ['.intercom-article-body', 'article', '.article-body', '[role="main"]', '.article-content']
         content_div = None
         for s in selectors:
@@ -187,61 +226,80 @@ class ToddleScraper:
         # Decompose noisy bits
         for unwanted in content_div.select('script, style, nav, header, footer, .intercom-reaction-picker, .breadcrumb'):
             unwanted.decompose()
-            
+        
+        if self.changes is not None and url:
+            return self.changes.convert(url, str(content_div), lambda: self._process_element_to_markdown(content_div))
         return self._process_element_to_markdown(content_div)
 
     def _process_element_to_markdown(self, element):
-        md = ""
-        seen = set()
-        for block in element.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'pre', 'blockquote', 'div'], recursive=True):
-            if block in seen: continue
-            classes = str(block.get('class', []))
-            if any(s in classes for s in ['breadcrumb', 'nav', 'header', 'footer']): continue
-            
-            tag, text = block.name, clean_text(block.get_text())
-            if not text and tag != 'pre': continue
-            
-            if tag.startswith('h'):
-                md += f"{'#' * int(tag[1])} {text}\n\n"
-                self._mark_seen(block, seen)
-            elif tag == 'p' and not any(p.name in ['ul', 'ol', 'li'] for p in block.parents):
-                md += f"{text}\n\n"
-                self._mark_seen(block, seen)
-            elif tag in ['ul', 'ol']:
-                for i, li in enumerate(block.find_all('li', recursive=False), 1):
-                    prefix = f"{i}." if tag == 'ol' else "-"
-                    md += f"{prefix} {clean_text(li.get_text())}\n"
-                md += "\n"
-                self._mark_seen(block, seen)
-            elif tag == 'pre':
-                md += f"```\n{block.get_text().strip()}\n```\n\n"
-                self._mark_seen(block, seen)
-            elif tag == 'blockquote':
-                md += f"> {text}\n\n"
-                self._mark_seen(block, seen)
-            elif tag == 'div' and any(c in classes for c in ['note', 'callout', 'alert']):
-                md += f"> **Note**: {text}\n\n"
-                self._mark_seen(block, seen)
-        return md
-
-    def _mark_seen(self, el, seen):
-        seen.add(el)
-        for child in el.find_all(True): seen.add(child)
-
-def scrape_toddle(url, driver):
-    scraper = ToddleScraper(driver)
+        return ToddleMarkdown(element).convert()
+
+class ToddleMarkdown(BlockConverter):
+    """Intercom article body to Markdown; note/callout/alert divs become quotes."""
+
+    ancestor_names = ('ul', 'ol', 'li')
+
+    def convert_block(self, i):
+        block = self.blocks[i]
+        classes = str(block.get('class', []))
+        if any(s in classes for s in ['breadcrumb', 'nav', 'header', 'footer']): return i + 1
+
+        tag = block.name
+        if not self.dom.has_text(block) and tag != 'pre': return i + 1
+
+        if tag.startswith('h'):
+            self.emit(f"{'#' * int(tag[1])} {clean_text(self.dom.text(block))}\n\n")
+        elif tag == 'p' and not self.dom.inside[i]:
+            self.emit(f"{clean_text(self.dom.text(block))}\n\n")
+        elif tag in ['ul', 'ol']:
+            for n, li in enumerate(block.find_all('li', recursive=False), 1):
+                prefix = f"{n}." if tag == 'ol' else "-"
+                self.emit(f"{prefix} {clean_text(self.dom.text(li))}\n")
+            self.emit("\n")
+        elif tag == 'pre':
+            self.fenced(self.dom.text(block).strip())
+        elif tag == 'blockquote':
+            self.emit(f"> {clean_text(self.dom.text(block))}\n\n")
+        elif tag == 'div' and any(c in classes for c in ['note', 'callout', 'alert']):
+            self.emit(f"> **Note**: {clean_text(self.dom.text(block))}\n\n")
+        else:
+            return i + 1
+        self.mark_seen(i)
+        return i + 1
+
+def scrape_toddle(url, driver, changes=None, frontier=None, pool=None, writer=None):
+    def scraped(article):
+        if changes is None or changes.is_delta(article['link']):
+            writer.scraped(article)
+
+    scraper = ToddleScraper(driver, changes, frontier, pool, scraped if writer is not None else None)
     if '/collections/' in url or '/topics/' in url:
         articles = scraper.scrape_collection(url)
-        return articles, format_articles_to_markdown(articles)
     elif '/articles/' in url:
         article = scraper.scrape_article(url)
         articles = [article] if article else []
-        return articles, format_articles_to_markdown(articles)
-    return [], "Error: Unsupported Toddle URL format"
+        if not article and changes is not None:
+            changes.mark_failed(url)
+    else:
+        return [], "Error: Unsupported Toddle URL format"
+    if changes is not None:
+        # Only re-emit what changed since the last run
+        articles = [a for a in articles if changes.is_delta(a['link'])]
+    return articles, format_articles_to_markdown(articles, writer)
+
+def format_articles_to_markdown(articles, writer=None):
+    """Write the export to writer (default: an in-memory MarkdownWriter) and return writer.getvalue().
 
-def format_articles_to_markdown(articles):
-    if not articles: return "No articles found."
-    md = f"# Toddle Documentation Export\n\n**Total Articles**: {len(articles)}\n\n---\n\n"
+    The header carries the article count, so nothing is written before the collection is scraped.
+    """
+    writer = writer or MarkdownWriter()
+    if not articles:
+        writer.write("No articles found.")
+        return writer.getvalue()
+    writer.write(f"# Toddle Documentation Export\n\n**Total Articles**: {len(articles)}\n\n---\n\n")
     for a in articles:
-        md += f"Entity: {a['entity']}\n\nTopic: {a['topic']}\n\nArticle: {a['article']}\n\nArticle Link: {a['link']}\n\nContent: \n{a['content']}\n\n---\n\n"
-    return md
+        writer.write_article(a, format_toddle_article(a))
+    return writer.getvalue()
+
+def format_toddle_article(a):
+    return f"Entity: {a['entity']}\n\nTopic: {a['topic']}\n\nArticle: {a['article']}\n\nArticle Link: {a['link']}\n\nContent: \n{a['content']}\n\n---\n\n"
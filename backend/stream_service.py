@@ -0,0 +1,131 @@
+"""Scrape results streamed article by article.
+
+The /stream variants of the scrape endpoints answer with one event per
+article as soon as the scraper finishes it, instead of one Markdown string
+at the end. The format is newline-delimited JSON (`format=ndjson`, the
+default) or Server-Sent Events (`format=sse`). Every event has a "type":
+
+    article  {"type": "article", "article": {Article or ToddleArticle fields}}
+    done     {"type": "done", "message": ..., "articles": n, "changes": ...}
+    error    {"type": "error", "status": 500, "detail": ...}
+
+The scrape runs on its own thread and writes into an ArticleStream, a
+MarkdownWriter that queues events instead of text. The queue is bounded, so
+a slow client slows the scrape down rather than filling the server's memory.
+If the client goes away the scrape still runs to the end (its frontier
+checkpoints stay useful for a resume), but nothing more is queued.
+"""
+import json
+import queue
+
+from models import Article, ToddleArticle
+from scrapers.markdown_writer import MarkdownWriter
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+def _levels_article(record):
+    levels = list(record['levels'].values())
+    module_name = levels[0] if levels else "Unknown"
+    category_level_1 = levels[1] if len(levels) > 1 else module_name
+    return Article(
+        module_name=module_name,
+        category_level_1=category_level_1,
+        category_level_2=levels[2] if len(levels) > 2 else category_level_1,
+        article_name=record['article_name'],
+        article_url=record['url'],
+        content=record['content'],
+        related_articles=[]
+    )
+
+def _isams_developer_article(record):
+    breadcrumbs = record['breadcrumbs']
+    module_name = breadcrumbs[0] if breadcrumbs else "Unknown"
+    category_level_1 = breadcrumbs[1] if len(breadcrumbs) > 1 else module_name
+    return Article(
+        module_name=module_name,
+        category_level_1=category_level_1,
+        category_level_2=breadcrumbs[2] if len(breadcrumbs) > 2 else category_level_1,
+        article_name=record['title'],
+        article_url=record['url'],
+        content=record['content'],
+        related_articles=[]
+    )
+
+# How each scraper's record becomes the API model
+ARTICLE_MODELS = {
+    # A Toddle URL sent to /scrape is handed on to the Toddle scraper
+    'scrape': lambda record: record if isinstance(record, Article) else ToddleArticle(**record),
+    'odoo': _levels_article,
+    'prompting-guide': _levels_article,
+    'isams-developer': _isams_developer_article,
+    'toddle': lambda record: ToddleArticle(**record),
+}
+
+class ArticleStream(MarkdownWriter):
+    def __init__(self, kind, max_queued=64, heartbeat=15):
+        super().__init__(sink=self)
+        self.to_model = ARTICLE_MODELS[kind]
+        self.heartbeat = heartbeat
+        self.closed = False
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._sent = set()
+
+    def write(self, markdown):
+        # Export headers and notices only make sense in the Markdown file
+        pass
+
+    def scraped(self, article):
+        self._send_article(article)
+
+    def write_article(self, article, markdown):
+        self._send_article(article)
+
+    def _send_article(self, article):
+        model = self.to_model(article)
+        key = model.link if isinstance(model, ToddleArticle) else model.article_url
+        if key in self._sent:
+            return
+        self._sent.add(key)
+        self.articles += 1
+        self._send({"type": "article", "article": model.model_dump()})
+
+    def finish(self, message, changes=None, markdown=""):
+        """End the stream after a successful scrape.
+
+        markdown is whatever the scraper returned instead of writing, e.g. an
+        "unsupported URL" notice.
+        """
+        event = {"type": "done", "message": message, "articles": self.articles, "changes": changes}
+        if markdown:
+            event["markdown"] = markdown
+        self._send(event)
+
+    def fail(self, status, detail):
+        self._send({"type": "error", "status": status, "detail": detail})
+
+    def _send(self, event):
+        while not self.closed:
+            try:
+                self._queue.put(event, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def events(self, format='ndjson'):
+        """Yield the encoded events until done or error; heartbeats keep idle proxies from closing the connection."""
+        try:
+            while True:
+                try:
+                    event = self._queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n" if format == 'sse' else "\n"
+                    continue
+                data = json.dumps(event)
+                yield f"event: {event['type']}\ndata: {data}\n\n" if format == 'sse' else data + "\n"
+                if event['type'] in ('done', 'error'):
+                    return
+        finally:
+            self.closed = True
@@ -0,0 +1,98 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+from auth_service import auth_service
+from driver_lease import DriverLeaseManager, LeaseTimeout
+from scrapers.browser import navigate
+
+class FakeDriver:
+    session_id = "fake-session"
+
+    def get(self, url):
+        raise WebDriverException("chrome not reachable")
+
+@contextmanager
+def fake_browser():
+    """Stand in for Chrome: lease_driver hands out a FakeDriver, discard_if_dead is counted."""
+    discarded = []
+    lease_driver, discard_if_dead = auth_service.lease_driver, auth_service.discard_if_dead
+    auth_service.lease_driver = lambda: FakeDriver()
+    auth_service.discard_if_dead = lambda: discarded.append(True)
+    try:
+        yield discarded
+    finally:
+        auth_service.lease_driver, auth_service.discard_if_dead = lease_driver, discard_if_dead
+
+def test_leases_are_first_come_first_served():
+    leases = DriverLeaseManager()
+    order = []
+    with fake_browser():
+        with leases.lease("first"):
+            threads = []
+            for label in ("second", "third", "fourth"):
+                def scrape(label=label):
+                    with leases.lease(label):
+                        order.append(label)
+                thread = threading.Thread(target=scrape)
+                thread.start()
+                threads.append(thread)
+                # Queue them in a known order
+                while len(leases.status()["queue"]) < len(threads):
+                    time.sleep(0.01)
+            status = leases.status()
+            assert status["holder"] == "first"
+            assert [entry["label"] for entry in status["queue"]] == ["second", "third", "fourth"]
+        for thread in threads:
+            thread.join()
+    assert order == ["second", "third", "fourth"]
+
+def test_lease_times_out():
+    leases = DriverLeaseManager()
+    with fake_browser():
+        with leases.lease("holder"):
+            try:
+                with leases.lease("impatient", timeout=0.1):
+                    raise AssertionError("got the browser while it was held")
+            except LeaseTimeout:
+                pass
+            assert leases.status()["queue"] == []
+        # The timed-out request left no ticket behind
+        with leases.lease("next", timeout=0.1):
+            pass
+
+def test_failed_scrape_checks_the_browser():
+    leases = DriverLeaseManager()
+    with fake_browser() as discarded:
+        with leases.lease("ok"):
+            pass
+        assert discarded == []
+        try:
+            with leases.lease("broken"):
+                raise RuntimeError("scrape failed")
+        except RuntimeError:
+            pass
+        assert discarded == [True]
+        assert leases.status()["holder"] is None
+
+def test_failed_navigation_checks_the_browser():
+    leases = DriverLeaseManager()
+    with fake_browser() as discarded:
+        # The scrapers catch per-page errors, so the lease itself ends normally
+        with leases.lease("scrape") as driver:
+            try:
+                navigate(driver, "https://example.com/article")
+            except WebDriverException:
+                pass
+        assert discarded == [True]
+        with leases.lease("next"):
+            pass
+        assert discarded == [True]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
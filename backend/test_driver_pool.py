@@ -0,0 +1,69 @@
+import tempfile
+from contextlib import contextmanager
+
+from auth_service import auth_service
+from driver_pool import DriverPool
+
+class FakeDriver:
+    """A pool browser; once dead, every call into it fails like a crashed Chrome."""
+
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.session_id = profile_dir
+        self.dead = False
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if self.dead:
+            raise ConnectionError("chrome not reachable")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+@contextmanager
+def fake_chrome():
+    """Start FakeDrivers instead of Chrome, each on a throwaway profile directory."""
+    saved = auth_service.profile_mode, auth_service.scrape_profile_dir, auth_service.new_driver
+    auth_service.profile_mode = 'slim'
+    auth_service.scrape_profile_dir = lambda prefix='scraper_profile_': tempfile.mkdtemp(prefix=prefix)
+    auth_service.new_driver = lambda user_data_dir, interactive=False: FakeDriver(user_data_dir)
+    try:
+        yield
+    finally:
+        auth_service.profile_mode, auth_service.scrape_profile_dir, auth_service.new_driver = saved
+
+def test_dead_driver_is_replaced():
+    with fake_chrome():
+        pool = DriverPool(size=1)
+        try:
+            with pool.driver() as driver:
+                driver.dead = True
+                raise RuntimeError("scrape failed")
+        except RuntimeError:
+            pass
+        assert driver.quit_called
+        with pool.driver() as replacement:
+            assert replacement is not driver and not replacement.dead
+        pool.close()
+
+def test_driver_outliving_the_pool_is_dropped():
+    with fake_chrome():
+        pool = DriverPool(size=1)
+        try:
+            with pool.driver() as driver:
+                # A login refresh restarts the pool while this scrape still runs
+                pool.close()
+                driver.dead = True
+                raise RuntimeError("scrape failed")
+        except RuntimeError:
+            pass
+        assert list(pool.map(lambda d, item: d is driver, [1, 2])) == [False, False]
+        pool.close()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
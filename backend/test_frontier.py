@@ -0,0 +1,148 @@
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from scrapers.frontier import CrawlFrontier, FrontierBusy, open_frontier, run_tracked, DONE, FAILED, IN_FLIGHT, QUEUED
+from scrapers.odoo_scraper import _crawl
+
+def new_frontier(job="test:crawl", path=None):
+    return CrawlFrontier(job, path or os.path.join(tempfile.mkdtemp(), 'frontier.sqlite3'))
+
+def page(title, links=(), body=""):
+    anchors = "".join(f'<a href="{href}">{href}</a>' for href in links)
+    return (f"<html><head><title>{title}</title></head><body><article class=\"doc-body\">"
+            f"<h1>{title}</h1><p>{body}</p>{anchors}</article></body></html>")
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_docs():
+    """Serve a small Odoo-style tree over HTTP; returns (root url, server)."""
+    root = tempfile.mkdtemp()
+    files = {
+        'docs/index.html': page("Docs", ["a/", "z.html"]),
+        'docs/z.html': page("Z", body="z"),
+        'docs/a/index.html': page("A", ["y.html", "b/"]),
+        'docs/a/y.html': page("Y", body="y"),
+        'docs/a/b/index.html': page("B", ["x.html", "w.html"]),
+        'docs/a/b/x.html': page("X", body="x"),
+        'docs/a/b/w.html': page("W", body="w"),
+    }
+    for name, html in files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(html)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/docs/", server
+
+def test_states_and_order():
+    frontier = new_frontier()
+    assert frontier.add("u1") and not frontier.add("u1")
+    assert frontier.add_all(["u2", "u1", "u3"]) == 2
+    frontier.start("u1")
+    frontier.complete("u1", {"content": "one"})
+    frontier.start("u2")
+    frontier.fail("u2", "boom")
+    assert [entry[:2] for entry in frontier.entries()] == [("u1", DONE), ("u2", FAILED), ("u3", QUEUED)]
+    assert frontier.record("u1") == {"content": "one"}
+    assert frontier.retry_failed() == 1
+    assert frontier.state("u2") == QUEUED
+
+def test_crashed_run_is_requeued():
+    path = os.path.join(tempfile.mkdtemp(), 'frontier.sqlite3')
+    frontier = new_frontier(path=path)
+    frontier.add_all(["u1", "u2"])
+    frontier.start("u1")
+    assert frontier.state("u1") == IN_FLIGHT
+    # The process dies here; the next run opens the store again
+    frontier = new_frontier(path=path)
+    assert frontier.state("u1") == QUEUED
+
+def test_run_tracked_serves_finished_urls():
+    frontier = new_frontier()
+    calls = []
+
+    def work(result):
+        calls.append(result)
+        return result
+
+    assert run_tracked(frontier, "u1", lambda: work({"content": "one"})) == {"content": "one"}
+    assert run_tracked(frontier, "u2", lambda: work(None)) is None
+    assert frontier.state("u2") == FAILED
+    # A resumed run neither redoes u1 nor retries u2
+    assert run_tracked(frontier, "u1", lambda: work({"content": "other"})) == {"content": "one"}
+    assert run_tracked(frontier, "u2", lambda: work({"content": "two"})) is None
+    assert len(calls) == 2
+
+def test_counts_survive_close():
+    frontier = new_frontier()
+    frontier.add_all(["u1", "u2"])
+    frontier.close()
+    assert frontier.counts() == {QUEUED: 2}
+
+def test_interrupted_crawl_resumes_to_the_same_result():
+    url, server = serve_docs()
+    try:
+        expected = [article['url'] for article in _crawl(url)]
+        assert [u[len(url):] for u in expected] == ["a/y.html", "a/b/x.html", "a/b/w.html", "z.html"]
+
+        path = os.path.join(tempfile.mkdtemp(), 'frontier.sqlite3')
+        frontier = new_frontier(path=path)
+        crawl = _crawl(url, frontier=frontier, max_workers=1)
+        next(crawl)
+        crawl.close()
+        frontier.close()
+
+        frontier = new_frontier(path=path)
+        resumed = [article['url'] for article in _crawl(url, frontier=frontier)]
+        assert resumed == expected
+        assert set(frontier.counts()) == {DONE}
+    finally:
+        server.shutdown()
+
+def test_crawl_limits():
+    url, server = serve_docs()
+    try:
+        shallow = [article['url'][len(url):] for article in _crawl(url, max_depth=2)]
+        assert shallow == ["a/y.html", "z.html"]
+        # Root, a/ and z.html: the cut-off pages must not hold back the output
+        assert len(list(_crawl(url, max_pages=3))) == 1
+    finally:
+        server.shutdown()
+
+def test_one_run_holds_a_frontier():
+    job = f"test:claim:{uuid.uuid4().hex}"
+    frontier = open_frontier(job)
+    try:
+        open_frontier(job)
+    except FrontierBusy:
+        pass
+    else:
+        raise AssertionError("a second run got the frontier")
+    frontier.close()
+    open_frontier(job, resume=True).close()
+
+def test_waiting_run_gets_the_frontier():
+    job = f"test:claim:{uuid.uuid4().hex}"
+    frontier = open_frontier(job)
+    opened = []
+    waiter = threading.Thread(target=lambda: opened.append(open_frontier(job, resume=True, wait=5)))
+    waiter.start()
+    time.sleep(0.1)
+    assert opened == []
+    frontier.close()
+    waiter.join()
+    assert len(opened) == 1
+    opened[0].close()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -0,0 +1,93 @@
+import functools
+import http.server
+import os
+import tempfile
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from scrapers.http_cache import HttpCache
+from scrapers.http_client import HttpClient
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_files(files):
+    """Serve {name: text} over HTTP (with Last-Modified / 304 support); returns (base url, server)."""
+    root = tempfile.mkdtemp()
+    for name, text in files.items():
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(text)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/", server
+
+def new_cache(**options):
+    return HttpCache(os.path.join(tempfile.mkdtemp(), 'http_cache.sqlite3'), **options)
+
+def response(body, **headers):
+    fake = requests.Response()
+    fake.status_code = 200
+    fake.headers = CaseInsensitiveDict(headers)
+    fake._content = body
+    return fake
+
+def test_store_and_validators():
+    cache = new_cache()
+    cache.store("https://example.com/a", response(b"a", ETag='"v1"', **{'Content-Type': 'text/html'}))
+    assert cache.validators("https://example.com/a") == {'If-None-Match': '"v1"'}
+    assert cache.load("https://example.com/a") == (b"a", 'text/html')
+    # Nothing to revalidate with: not stored
+    cache.store("https://example.com/b", response(b"b"))
+    assert cache.load("https://example.com/b") is None
+
+def test_least_recently_used_is_evicted():
+    cache = new_cache(max_bytes=10)
+    cache.store("https://example.com/a", response(b"aaaa", ETag='"a"'))
+    cache.store("https://example.com/b", response(b"bbbb", ETag='"b"'))
+    cache.load("https://example.com/a")
+    cache.store("https://example.com/c", response(b"cccc", ETag='"c"'))
+    assert cache.load("https://example.com/b") is None
+    assert cache.load("https://example.com/a") is not None
+    assert cache.load("https://example.com/c") is not None
+
+def test_not_modified_is_served_from_cache():
+    base, server = serve_files({'page.html': "<p>hello</p>"})
+    try:
+        client = HttpClient(cache=new_cache())
+        first = client.get(base + "page.html")
+        assert first.status_code == 200 and not getattr(first, 'from_cache', False)
+        second = client.get(base + "page.html")
+        assert second.status_code == 200 and second.from_cache
+        assert second.text == "<p>hello</p>"
+        client.close()
+    finally:
+        server.shutdown()
+
+def test_private_responses_are_not_stored():
+    cache = new_cache()
+    cache.store("https://example.com/a", response(b"a", ETag='"a"', **{'Cache-Control': 'private, max-age=0'}))
+    cache.store("https://example.com/b", response(b"b", ETag='"b"', **{'Cache-Control': 'no-store'}))
+    cache.store("https://example.com/c", response(b"c", ETag='"c"', Vary='Accept-Encoding, Cookie'))
+    cache.store("https://example.com/d", response(b"d", ETag='"d"', Vary='Accept-Encoding'))
+    assert [cache.load(f"https://example.com/{name}") is not None for name in "abcd"] == [False, False, False, True]
+
+def test_browser_cookies_bypass_the_cache():
+    base, server = serve_files({'page.html': "<p>members only</p>"})
+    try:
+        cache = new_cache()
+        client = HttpClient(cache=cache)
+        client.set_cookies([{'name': 'session', 'value': 'secret', 'domain': '127.0.0.1'}])
+        client.get(base + "page.html")
+        assert cache.load(base + "page.html") is None
+        client.close()
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -0,0 +1,51 @@
+from scrapers.hybrid_driver import BatchFetchDriver
+from scrapers.politeness import politeness
+
+HOST = "prefetch.example.test"
+
+class FakeDriver:
+    """Answers the in-browser fetch() batches; 'down' pages fail with a network error."""
+
+    records = True
+
+    def __init__(self):
+        self.batches = []
+        self.recorded = []
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_async_script(self, script, urls, concurrency):
+        self.batches.append(list(urls))
+        results = {}
+        for url in urls:
+            if 'down' in url:
+                results[url] = {'status': None, 'html': None}
+            else:
+                results[url] = {'status': 200, 'html': f"<p>{url}</p>"}
+        return results
+
+    def record(self, url, html):
+        self.recorded.append(url)
+
+def test_prefetch_is_paced_per_url():
+    politeness.host_overrides[HOST] = dict(rate=1000.0, burst=100, initial_concurrency=3)
+    limiter = politeness.limiter(f"https://{HOST}/")
+    urls = [f"https://{HOST}/{n}.html" for n in range(5)] + [f"https://{HOST}/down.html"]
+    browser = FakeDriver()
+    driver = BatchFetchDriver(browser)
+    driver.prefetch(urls)
+    # One fetch() per concurrency slot, not one batch of 25
+    assert [len(batch) for batch in browser.batches] == [3, 3]
+    assert limiter.in_flight == 0
+    # The network error counted against the host
+    assert limiter.concurrency < 3
+    assert browser.recorded == urls[:5]
+    driver.get(urls[0])
+    assert driver.over_http and driver.page_source == f"<p>{urls[0]}</p>"
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -0,0 +1,78 @@
+import io
+import tempfile
+import threading
+import time
+
+import job_service
+from job_service import JobScheduler, JobWriter, DONE, QUEUED, RUNNING
+
+job_service.JOBS_DIR = tempfile.mkdtemp()
+
+def wait_for(job, state=DONE, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.state != state:
+        assert time.monotonic() < deadline, f"job stayed {job.state}"
+        time.sleep(0.01)
+
+def test_same_crawl_runs_one_at_a_time():
+    scheduler = JobScheduler(workers=3)
+    release = threading.Event()
+    log = []
+
+    def runner(request, writer, job):
+        log.append(("start", request))
+        if request == "first":
+            release.wait(5)
+        log.append(("end", request))
+        return "", None, None
+
+    scheduler.register("docs", runner)
+    first = scheduler.submit("docs", "https://docs.example.com/a", "first")
+    wait_for(first, RUNNING)
+    second = scheduler.submit("docs", "https://docs.example.com/a", "second")
+    other = scheduler.submit("docs", "https://docs.example.com/b", "other")
+    # Another crawl runs at once; the same crawl waits its turn
+    wait_for(other)
+    assert second.state == QUEUED
+    release.set()
+    wait_for(second)
+    assert log.index(("end", "first")) < log.index(("start", "second"))
+    scheduler.close()
+
+def test_browser_jobs_do_not_hold_up_http_jobs():
+    scheduler = JobScheduler(workers=1)
+    release = threading.Event()
+
+    def browser_runner(request, writer, job):
+        # Waiting for the browser lease
+        release.wait(5)
+        return "", None, None
+
+    scheduler.register("toddle", browser_runner, browser=True)
+    scheduler.register("docs", lambda request, writer, job: ("", None, None))
+    first = scheduler.submit("toddle", "https://support.example.com/a", None)
+    wait_for(first, RUNNING)
+    second = scheduler.submit("toddle", "https://support.example.com/b", None)
+    http = scheduler.submit("docs", "https://docs.example.com/", None)
+    wait_for(http)
+    # Browser jobs take turns on their own worker
+    assert second.state == QUEUED
+    release.set()
+    wait_for(second)
+    scheduler.close()
+
+def test_held_back_articles_count_as_converted():
+    writer = JobWriter(io.StringIO())
+    # The Toddle export writes every article at the end, after its header
+    for n in range(3):
+        writer.scraped({"title": f"Article {n}"})
+    assert writer.converted == 3
+    for n in range(3):
+        writer.write_article({"title": f"Article {n}"}, f"## Article {n}\n\n")
+    assert writer.converted == 3
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -0,0 +1,101 @@
+import os
+import tempfile
+
+from scrapers.manifest import Manifest
+
+SCOPE = "https://docs.example.com/"
+A = SCOPE + "a.html"
+B = SCOPE + "b.html"
+C = SCOPE + "c.html"
+
+def new_manifest():
+    return Manifest(os.path.join(tempfile.mkdtemp(), 'manifest.sqlite3'))
+
+def scrape(manifest, pages, failed=(), complete=True):
+    """One incremental run over pages ({url: region html}); returns (markdown by url, summary)."""
+    run = manifest.start_run(SCOPE)
+    converted = {}
+    for url, region in pages.items():
+        converted[url] = run.convert(url, region, lambda region=region: f"md:{region}")
+    for url in failed:
+        run.mark_failed(url)
+    if not complete:
+        run.mark_incomplete()
+    return converted, run.finish(), run
+
+def test_added_changed_unchanged_removed():
+    manifest = new_manifest()
+    _, summary, _ = scrape(manifest, {A: "<p>a</p>", B: "<p>b</p>"})
+    assert summary["added"] == [A, B]
+
+    calls = []
+    run = manifest.start_run(SCOPE)
+    assert run.convert(A, "<p>a</p>", lambda: calls.append(A)) == "md:<p>a</p>"
+    assert calls == [], "an unchanged region must not be converted again"
+    run.convert(C, "<p>c</p>", lambda: "md:c")
+    summary = run.finish()
+    assert summary["added"] == [C]
+    assert summary["removed"] == [B]
+    assert summary["unchanged"] == 1
+
+    _, summary, _ = scrape(manifest, {A: "<p>a2</p>", C: "<p>c</p>"})
+    assert summary["changed"] == [A]
+    assert summary["removed"] == []
+
+def test_hashes_are_only_stored_by_finish():
+    manifest = new_manifest()
+    scrape(manifest, {A: "<p>a</p>"})
+
+    run = manifest.start_run(SCOPE)
+    run.convert(A, "<p>a2</p>", lambda: "md:a2")
+    assert run.is_delta(A)
+    # The run dies here without finish(): the next one still sees the change
+    _, summary, _ = scrape(manifest, {A: "<p>a2</p>"})
+    assert summary["changed"] == [A]
+
+def test_same_markdown_is_unchanged():
+    manifest = new_manifest()
+    scrape(manifest, {A: "<p>a</p>"})
+    run = manifest.start_run(SCOPE)
+    # Only the markup around the content changed
+    run.convert(A, "<div><p>a</p></div>", lambda: "md:<p>a</p>")
+    assert not run.is_delta(A)
+    assert run.finish()["unchanged"] == 1
+
+def test_failed_urls_are_not_removed():
+    manifest = new_manifest()
+    scrape(manifest, {A: "<p>a</p>", B: "<p>b</p>"})
+    _, summary, _ = scrape(manifest, {A: "<p>a</p>"}, failed=[B])
+    assert summary["removed"] == []
+    assert summary["failed"] == [B]
+    _, summary, _ = scrape(manifest, {A: "<p>a</p>"})
+    assert summary["removed"] == [B]
+
+def test_incomplete_crawl_removes_nothing():
+    manifest = new_manifest()
+    scrape(manifest, {A: "<p>a</p>", B: "<p>b</p>"})
+    _, summary, _ = scrape(manifest, {A: "<p>a</p>"}, complete=False)
+    assert summary["removed"] == []
+
+def test_kept_urls_count_as_seen():
+    manifest = new_manifest()
+    scrape(manifest, {A: "<p>a</p>", B: "<p>b</p>"})
+    run = manifest.start_run(SCOPE)
+    run.convert(A, "<p>a</p>", lambda: "md:<p>a</p>")
+    # B was served from a resumed frontier with the Markdown the manifest already has
+    run.keep(B, "md:<p>b</p>")
+    summary = run.finish()
+    assert summary["removed"] == []
+    assert summary["unchanged"] == 2
+
+    run = manifest.start_run(SCOPE)
+    run.convert(A, "<p>a</p>", lambda: "md:<p>a</p>")
+    # The interrupted run had converted a newer version of B
+    run.keep(B, "md:<p>b2</p>")
+    assert run.finish()["changed"] == [B]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -0,0 +1,142 @@
+import os
+
+from bs4 import BeautifulSoup
+
+from scrapers.isams_developer_scraper import IsamsMarkdown
+from scrapers.markdown import BlockConverter, DomIndex
+from scrapers.prompting_guide_scraper import scrape_prompting_guide_article
+from scrapers.toddle_scraper import ToddleMarkdown
+
+# Expected Markdown is what the per-site converters produced before they moved onto BlockConverter
+TODDLE = """<div class="article">
+<h1>Setting up <b>classes</b></h1>
+<p>Open the   <a href="#">Classes</a> page.</p>
+<div class="callout note"><p>Only admins can do this.</p></div>
+<ul><li>First <p>inner paragraph</p></li><li>Second</li></ul>
+<ol><li>One</li><li>Two</li></ol>
+<p>   </p>
+<pre>  code here  </pre>
+<blockquote>Quoted   text</blockquote>
+<div class="breadcrumb"><p>Home</p></div>
+<p>Repeated</p>
+<div><p>Repeated</p></div>
+<h3>End</h3>
+</div>"""
+
+ISAMS = """<div class="rm-Article">
+<h2>Authentication</h2>
+<p>Use a <code>token</code> header.</p>
+<div class="rm-Callout"><div class="rm-Callout-title">Warning</div><div class="rm-Callout-body">Keep it <b>secret</b>.</div></div>
+<div class="wrapper"><p>Inside a wrapper</p></div>
+<p>Prompt:</p>
+<div class="rm-CodeBlock"><pre><code>GET /api/students</code></pre></div>
+<ul><li>Alpha <em>one</em></li><li>Beta</li></ul>
+<ol><li>Step</li></ol>
+<pre><code>line one
+line two</code></pre>
+<blockquote>  Quote </blockquote>
+<div class="rm-Article-navigation"><p>Next</p></div>
+</div>"""
+
+PROMPTING = """<html><body><main>
+<h1>Zero-shot</h1>
+<div class="nextra-breadcrumb"><p>Techniques</p></div>
+<h2>Example <a href="#x">#</a></h2>
+<p>Large   language models can do this.</p>
+<p>Prompt:</p>
+<pre><code data-language="text">Classify the text.</code></pre>
+<pre><code data-language="text">Neutral</code></pre>
+<p>Output:</p>
+<div class="nextra-code-block"><pre><code class="language-python">print(1)
+print(2)</code></pre></div>
+<ul><li>One</li><li>Two</li></ul>
+<ol><li>First</li><li>Second</li></ol>
+<pre><code class="language-js">x = 1</code></pre>
+<div class="nx-mt-16"><p>Footer</p></div>
+</main></body></html>"""
+
+def soups():
+    yield BeautifulSoup(TODDLE, 'html.parser')
+    yield BeautifulSoup(ISAMS, 'html.parser')
+    yield BeautifulSoup(PROMPTING, 'html.parser')
+    saved = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'toddle_debug.html')
+    if os.path.exists(saved):
+        with open(saved, encoding='utf-8') as f:
+            yield BeautifulSoup(f.read(), 'html.parser')
+
+def test_dom_index_matches_bs4():
+    for soup in soups():
+        root = soup.find('main') or soup.find('body') or soup
+        dom = DomIndex(root, BlockConverter.block_names)
+        assert dom.blocks == root.find_all(BlockConverter.block_names)
+        for tag in [root] + dom.blocks:
+            text = tag.get_text()
+            assert dom.text(tag) == text
+            assert dom.stripped_text(tag) == tag.get_text(strip=True)
+            assert dom.has_text(tag) == bool(text.strip())
+            assert dom.short_text(tag, 7) == (text.strip() if len(text.strip()) <= 7 else None)
+        for i, block in enumerate(dom.blocks):
+            assert dom.blocks[i + 1:dom.block_end[i]] == block.find_all(BlockConverter.block_names)
+
+def test_equal_tags_have_equal_shapes():
+    soup = BeautifulSoup("<div><p>Same <b>text</b></p><p>Same <b>text</b></p><p>Other</p></div>", 'html.parser')
+    dom = DomIndex(soup.div, ['p'])
+    first, second, other = dom.blocks
+    assert dom.shape(first) == dom.shape(second)
+    assert dom.shape(first) != dom.shape(other)
+
+def test_inside_tracks_list_ancestors():
+    soup = BeautifulSoup("<div><p>out</p><ul><li><p>in</p></li></ul></div>", 'html.parser')
+    dom = DomIndex(soup.div, ['p', 'ul'], ancestor_names=('ul', 'li'))
+    assert dom.inside == [False, False, True]
+
+def test_toddle_markdown():
+    root = BeautifulSoup(TODDLE, 'html.parser').div
+    assert ToddleMarkdown(root).convert() == (
+        '# Setting up classes\n\n'
+        'Open the Classes page.\n\n'
+        '> **Note**: Only admins can do this.\n\n'
+        '- First inner paragraph\n- Second\n\n'
+        '1. One\n2. Two\n\n'
+        '```\ncode here\n```\n\n'
+        '> Quoted text\n\n'
+        'Home\n\n'
+        'Repeated\n\n'
+        '### End\n\n')
+
+def test_isams_markdown():
+    root = BeautifulSoup(ISAMS, 'html.parser').div
+    assert IsamsMarkdown(root).convert() == (
+        '## Authentication\n\n'
+        'Use a token header.\n\n'
+        '> **Warning**\n> Keep itsecret.\n\n'
+        'Inside a wrapper\n\n'
+        '**Prompt**: `GET /api/students`\n\n'
+        '- Alphaone\n- Beta\n\n'
+        '1. Step\n\n'
+        '```\nline one\nline two\n```\n\n'
+        '> Quote\n\n'
+        'Next\n\n')
+
+def test_prompting_guide_markdown():
+    article = scrape_prompting_guide_article("https://www.promptingguide.ai/techniques/zeroshot",
+                                             BeautifulSoup(PROMPTING, 'html.parser'))
+    assert article["article_name"] == "Zero-shot"
+    assert article["levels"] == {"level_1": "Techniques"}
+    assert article["content"] == (
+        'Techniques\n\n'
+        '## Example \n\n'
+        'Large language models can do this.\n\n'
+        '**Prompt**: `Classify the text.`\n\n'
+        '**Output**: `Neutral`\n\n'
+        '**Output**:\n```\nprint(1)\nprint(2)\n```\n\n'
+        '- One\n- Two\n\n'
+        '1. First\n2. Second\n\n'
+        '```js\nx = 1\n```\n\n'
+        'Footer\n\n')
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
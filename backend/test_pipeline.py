@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapers import pipeline
+from scrapers.frontier import CrawlFrontier, DONE, IN_FLIGHT
+from scrapers.manifest import Manifest, content_hash
+from scrapers.pipeline import Pipeline, _RegionRecorder
+
+SCOPE = "https://docs.example.com/"
+URLS = [SCOPE + f"{n}.html" for n in range(6)]
+
+def convert_page(url, page, changes):
+    """A pipeline convert function: module-level, so worker processes can run it."""
+    region = f"<article>{page}</article>"
+    convert = lambda: f"md:{page}"
+    return {"url": url, "content": changes.convert(url, region, convert) if changes is not None else convert()}
+
+def run(pages, manifest, executor):
+    """One incremental run over pages ({url: text}); returns (records, summary)."""
+    changes = manifest.start_run(SCOPE)
+    with Pipeline(fetch_workers=3, executor=executor) as line:
+        records = list(line.map(pages.get, convert_page, URLS, changes))
+    # Pages finish in any order, and so are listed in the summary
+    summary = {key: sorted(value) if isinstance(value, list) else value for key, value in changes.finish().items()}
+    return records, summary
+
+def in_process_and_in_workers(check):
+    """Run check(executor) with conversion on the fetch threads, then in a process pool."""
+    workers = pipeline.convert_workers
+    pipeline.convert_workers = 1
+    try:
+        first = check(None)
+    finally:
+        pipeline.convert_workers = workers
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("forkserver")) as executor:
+        second = check(executor)
+    return first, second
+
+def test_workers_give_the_same_results():
+    pages = {url: f"page {n}" for n, url in enumerate(URLS)}
+    changed = dict(pages, **{URLS[1]: "page 1, edited"})
+    del changed[URLS[4]]
+
+    def check(executor):
+        manifest = Manifest(os.path.join(tempfile.mkdtemp(), 'manifest.sqlite3'))
+        first = run(pages, manifest, executor)
+        second = run(changed, manifest, executor)
+        return first, second
+
+    in_process, in_workers = in_process_and_in_workers(check)
+    assert in_process == in_workers
+    (records, summary), (again, incremental) = in_process
+    assert [record["content"] for record in records] == [f"md:page {n}" for n in range(6)]
+    assert summary["added"] == URLS
+    assert again[1]["content"] == "md:page 1, edited" and again[4] is None
+    assert incremental["changed"] == [URLS[1]]
+    assert incremental["failed"] == [URLS[4]]
+    assert incremental["unchanged"] == 4
+
+def test_worker_skips_unchanged_regions():
+    calls = []
+    recorder = _RegionRecorder(content_hash("<p>a</p>"))
+    assert recorder.convert(SCOPE, "<p>a</p>", lambda: calls.append(1)) is None
+    assert calls == []
+    recorder = _RegionRecorder(content_hash("<p>a</p>"))
+    assert recorder.convert(SCOPE, "<p>b</p>", lambda: "md:b") == "md:b"
+    assert recorder.region_hash == content_hash("<p>b</p>")
+
+def test_close_waits_for_callbacks():
+    frontier = CrawlFrontier("test:pipeline", os.path.join(tempfile.mkdtemp(), 'frontier.sqlite3'))
+    started = threading.Event()
+
+    def slow_fetch(url):
+        started.set()
+        time.sleep(0.2)
+        return url
+
+    line = Pipeline(fetch_workers=2)
+    futures = [line.submit(slow_fetch, convert_page, url, frontier=frontier) for url in URLS]
+    started.wait()
+    line.close()
+    states = [frontier.state(url) for url in URLS]
+    # The two pages being fetched finish; the queued ones stay in flight for a resume
+    assert states == [DONE, DONE] + [IN_FLIGHT] * 4
+    assert all(future.done() for future in futures)
+    time.sleep(0.3)
+    assert [frontier.state(url) for url in URLS] == states
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
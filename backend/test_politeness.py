@@ -0,0 +1,106 @@
+import time
+
+import requests
+
+from scrapers.politeness import HostLimiter, Politeness, parse_retry_after
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def test_token_bucket_paces_requests():
+    limiter = HostLimiter("example.com", rate=20.0, burst=2, initial_concurrency=8)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release()
+    # Two from the burst, then four at 20 per second
+    assert time.monotonic() - started >= 0.15
+
+def test_concurrency_limit():
+    limiter = HostLimiter("example.com", rate=1000.0, burst=100, initial_concurrency=2)
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter.in_flight == 2
+    # A batch only gets what is left, which is nothing until a slot comes back
+    limiter.release()
+    assert limiter.acquire_batch(5) == 1
+    assert limiter.in_flight == 2
+
+def test_aimd_grows_and_halves():
+    limiter = HostLimiter("example.com", rate=4.0, burst=100, initial_concurrency=4, max_concurrency=16, rate_step=1.0)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(200, 0.1)
+    assert limiter.concurrency == 5
+    assert limiter.rate == 5.0
+
+    limiter.acquire()
+    limiter.release(503, 0.1)
+    assert limiter.concurrency == 2
+    assert limiter.rate == 2.5
+
+def test_latency_spike_backs_off():
+    limiter = HostLimiter("example.com", burst=100, initial_concurrency=8)
+    limiter.acquire()
+    limiter.release(200, 0.2)
+    limiter.acquire()
+    limiter.release(200, 2.0)
+    assert limiter.concurrency == 4
+
+def test_retries_429_with_retry_after():
+    politeness = Politeness(backoff_base=0.0)
+    responses = [FakeResponse(429, {'Retry-After': '0'}), FakeResponse(503), FakeResponse(200)]
+    response = politeness.call("https://example.com/a", lambda: responses.pop(0))
+    assert response.status_code == 200
+    assert not responses
+
+def test_gives_up_after_max_retries():
+    politeness = Politeness(max_retries=2, backoff_base=0.0)
+    calls = []
+    response = politeness.call("https://example.com/a", lambda: calls.append(1) or FakeResponse(503))
+    assert response.status_code == 503
+    assert len(calls) == 3
+
+def test_only_connection_errors_are_retried():
+    politeness = Politeness(backoff_base=0.0)
+    limiter = politeness.limiter("https://example.com/a")
+    concurrency, rate = limiter.concurrency, limiter.rate
+    calls = []
+
+    def bad_url():
+        calls.append(1)
+        raise requests.exceptions.MissingSchema("no scheme")
+
+    try:
+        politeness.call("https://example.com/a", bad_url)
+    except requests.exceptions.MissingSchema:
+        pass
+    else:
+        raise AssertionError("MissingSchema was swallowed")
+    assert len(calls) == 1
+    assert (limiter.concurrency, limiter.rate, limiter.in_flight) == (concurrency, rate, 0)
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise requests.ConnectionError("reset")
+        return FakeResponse(200)
+
+    assert politeness.call("https://example.com/a", flaky).status_code == 200
+    assert len(attempts) == 3
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 0 <= parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") <= 1
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -38,8 +38,9 @@ export const scrape = async (categoryUrl: string) => {
     return response.data;
 };
 
-export const scrapeOdoo = async (url: string) => {
-    const response = await api.post('/scrape-odoo', { url });
+// discovery 'sphinx' plans the crawl from the docs' search index instead of following links
+export const scrapeOdoo = async (url: string, discovery: 'links' | 'sphinx' = 'links') => {
+    const response = await api.post('/scrape-odoo', { url, discovery });
     return response.data;
 };
 
@@ -57,3 +58,41 @@ export const scrapeToddle = async (url: string) => {
     const response = await api.post('/scrape-toddle', { url });
     return response.data;
 };
+
+export type ScrapeStreamEvent =
+    | { type: 'article'; article: Record<string, unknown> }
+    | { type: 'done'; message: string; articles: number; changes: Record<string, unknown> | null; markdown?: string }
+    | { type: 'error'; status: number; detail: string };
+
+// Reads a /stream endpoint's newline-delimited JSON and hands over each event as it arrives.
+// path is e.g. '/scrape-toddle/stream'; body is the same as for the non-streaming endpoint.
+export const streamScrape = async (
+    path: string,
+    body: Record<string, unknown>,
+    onEvent: (event: ScrapeStreamEvent) => void,
+    signal?: AbortSignal,
+) => {
+    const response = await fetch(`${API_URL}${path}?format=ndjson`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body),
+        signal,
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Stream request failed: ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffered = '';
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffered += value;
+        const lines = buffered.split('\n');
+        buffered = lines.pop() ?? '';
+        for (const line of lines) {
+            // Blank lines are keep-alive heartbeats
+            if (line.trim()) onEvent(JSON.parse(line));
+        }
+    }
+};